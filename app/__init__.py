@@ -1,4 +1,8 @@
 from os import getenv
+from time import perf_counter
+
+# Start of the app's own import, for the startup timings in app.main.
+import_started = perf_counter()
 
 from dotenv import load_dotenv
 
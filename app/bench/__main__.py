@@ -0,0 +1,99 @@
+"""Load and latency benchmark for every blog route.
+
+    python -m app.bench --requests 500 --concurrency 16 --out bench.json
+    python -m app.bench --baseline baseline.json --threshold 0.15
+    python -m app.bench --base-url http://127.0.0.1:8080/api/v1/blog
+
+Seeds a throwaway dataset in the configured database, drives each route at a
+fixed concurrency (in-process through the ASGI transport, or against a running
+server with --base-url), writes throughput and p50/p95/p99 latency with
+histograms to JSON, and removes the dataset again. With --baseline the run
+exits non-zero when any route regresses beyond --threshold.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from httpx import ASGITransport, AsyncClient
+
+from app import settings
+from app.bench.dataset import cleanup, seed
+from app.bench.report import compare, load_json, print_table, write_json
+from app.bench.runner import run
+from app.bench.scenarios import SCENARIOS
+from app.core.db import async_engine
+from app.main import app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts-per-user", type=int, default=20)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--only", action="append", default=[], help="run routes whose name contains this (repeatable)")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against results from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def select_scenarios(only: list) -> dict:
+    if not only:
+        return dict(SCENARIOS)
+    return {name: scenario for name, scenario in SCENARIOS.items() if any(part in name for part in only)}
+
+
+def make_client(base_url: str = None) -> AsyncClient:
+    if base_url:
+        return AsyncClient(base_url=base_url, timeout=60)
+    return AsyncClient(transport=ASGITransport(app=app), base_url=f"http://bench{settings.api_v1_prefix}/blog")
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    scenarios = select_scenarios(args.only)
+    dataset = await seed(
+        users=args.users,
+        posts_per_user=args.posts_per_user,
+        comments_per_post=args.comments_per_post,
+        disposable=args.requests + args.warmup
+    )
+    try:
+        async with make_client(args.base_url) as client:
+            routes = await run(client, scenarios, dataset, args.requests, args.concurrency, warmup=args.warmup)
+    finally:
+        await cleanup(dataset)
+        await async_engine.dispose()
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "transport": "http" if args.base_url else "asgi",
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "dataset": dataset.describe(),
+        },
+        "routes": routes,
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    results = asyncio.run(benchmark(args))
+    print_table(results)
+    if args.out:
+        write_json(args.out, results)
+    if args.baseline:
+        regressions = compare(results, load_json(args.baseline), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
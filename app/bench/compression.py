@@ -0,0 +1,98 @@
+"""Compare CPU time and bytes saved for each response encoding and level.
+
+    python -m app.bench.compression --repeat 20
+
+Seeds a throwaway dataset in the configured database, fetches a few real
+responses uncompressed through the ASGI transport (a page of posts, a page
+of comments and the NDJSON post export, kept as the chunks it is streamed
+in) and compresses each one with every encoding and level the server can
+use: whole-body payloads in one go, the export chunk by chunk with a flush
+per chunk as CompressionMiddleware sends it. Reports the compression ratio
+and CPU milliseconds per MB of input, then removes the dataset again.
+"""
+import argparse
+import asyncio
+import sys
+from time import process_time
+from typing import List
+
+from httpx import ASGITransport, AsyncClient
+
+from app import settings
+from app.bench.dataset import cleanup, seed
+from app.blog.export import export_statement, stream_ndjson
+from app.core.compression import available_encodings, make_encoder
+from app.core.db import async_engine
+from app.main import app
+
+LEVELS = {
+    "gzip": (1, 3, 6, 9),
+    "zstd": (1, 3, 6, 10, 19),
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench.compression", description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="compressions per payload and level")
+    parser.add_argument("--export-batch-size", type=int, default=100, help="export rows per streamed chunk")
+    return parser.parse_args(argv)
+
+
+async def fetch_payloads(client: AsyncClient, dataset) -> dict:
+    identity = {"Accept-Encoding": "identity"}
+    posts = await client.get("/posts?limit=100", headers=identity)
+    comments = await client.get(f"/posts/{dataset.posts[0]}/comments?limit=100", headers=identity)
+    # The ASGI transport joins streamed bodies, so take the export's chunks
+    # straight from the generator behind the route.
+    export = [chunk async for chunk in stream_ndjson(export_statement("posts"))]
+    return {
+        "GET /posts": [posts.content],
+        "GET /posts/{uuid}/comments": [comments.content],
+        "GET /export/posts (streamed)": export,
+    }
+
+
+def measure(chunks: List[bytes], encoding: str, level: int, repeat: int) -> dict:
+    size = sum(len(chunk) for chunk in chunks)
+    started = process_time()
+    for _ in range(repeat):
+        encoder = make_encoder(encoding, level)
+        compressed = sum(
+            len(encoder.compress(chunk, final=i == len(chunks) - 1)) for i, chunk in enumerate(chunks)
+        )
+    cpu = (process_time() - started) / repeat
+    return {
+        "ratio": size / compressed,
+        "cpu_ms_per_mb": cpu * 1000 / (size / 1024 / 1024),
+        "saved": 1 - compressed / size,
+    }
+
+
+async def main(args: argparse.Namespace):
+    dataset = await seed(users=10, posts_per_user=20, comments_per_post=100)
+    settings.export_batch_size = args.export_batch_size
+    transport = ASGITransport(app=app)
+    base_url = f"http://bench{settings.api_v1_prefix}/blog"
+    try:
+        async with AsyncClient(transport=transport, base_url=base_url) as client:
+            payloads = await fetch_payloads(client, dataset)
+    finally:
+        await cleanup(dataset)
+        await async_engine.dispose()
+
+    for name, chunks in payloads.items():
+        size = sum(len(chunk) for chunk in chunks)
+        print(f"{name}: {size / 1024:,.1f} KiB in {len(chunks)} chunk(s)", file=sys.stdout)
+        print(f"  {'encoding':<10}{'level':>6}{'ratio':>8}{'saved':>8}{'CPU ms/MB':>12}", file=sys.stdout)
+        for encoding in available_encodings():
+            for level in LEVELS[encoding]:
+                result = measure(chunks, encoding, level, args.repeat)
+                print(
+                    f"  {encoding:<10}{level:>6}{result['ratio']:>8.2f}{result['saved']:>8.0%}"
+                    f"{result['cpu_ms_per_mb']:>12.1f}",
+                    file=sys.stdout
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
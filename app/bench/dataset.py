@@ -0,0 +1,110 @@
+from itertools import cycle
+from typing import List
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, insert, or_, select
+
+from app.core.db import async_session_factory
+from app.core.ids import uuid7
+from app.core.models import Comment, Post, User, UserDeletion
+
+WORDS = (
+    "postgres async latency index cursor cache query pool python fastapi "
+    "request tuning replica vacuum backlog throughput snapshot commit"
+).split()
+
+
+def _text(i: int, words: int) -> str:
+    return " ".join(WORDS[(i * 7 + n) % len(WORDS)] for n in range(words))
+
+
+class Dataset:
+    """Rows seeded for one benchmark run.
+
+    `disposable_*` rows exist only to be consumed by the DELETE routes, so
+    deleting never eats into the data the read routes are measured on.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.users: List[UUID] = []
+        self.posts: List[UUID] = []
+        self.comments: List[UUID] = []
+        self.disposable_users: List[UUID] = []
+        self.disposable_posts: List[UUID] = []
+        self.disposable_comments: List[UUID] = []
+
+    @property
+    def username_prefix(self) -> str:
+        return f"bench-{self.run_id}-"
+
+    def describe(self) -> dict:
+        return {
+            "users": len(self.users),
+            "posts": len(self.posts),
+            "comments": len(self.comments),
+            "disposable": len(self.disposable_users),
+        }
+
+
+def _user(prefix: str, i: int) -> dict:
+    return {
+        "uuid": uuid7(),
+        "username": f"{prefix}{i}",
+        "email": f"{prefix}{i}@example.com",
+        "hashed_password": "x",
+    }
+
+
+async def seed(users: int = 10, posts_per_user: int = 10, comments_per_post: int = 5, disposable: int = 0) -> Dataset:
+    dataset = Dataset(uuid4().hex[:8])
+    prefix = dataset.username_prefix
+    user_rows = [_user(prefix, i) for i in range(users + disposable)]
+    post_rows = [
+        {"uuid": uuid7(), "title": _text(i, 4), "content": _text(i, 60), "author_uuid": user["uuid"]}
+        for user in user_rows[:users]
+        for i in range(posts_per_user)
+    ]
+    authors = cycle(user["uuid"] for user in user_rows[:users])
+    comment_rows = [
+        {"uuid": uuid7(), "content": _text(i, 20), "post_uuid": post["uuid"], "author_uuid": next(authors)}
+        for post in post_rows
+        for i in range(comments_per_post)
+    ]
+    # Disposable posts and comments hang off the first seeded user and post.
+    disposable_posts = [
+        {"uuid": uuid7(), "title": _text(i, 4), "content": _text(i, 60), "author_uuid": user_rows[0]["uuid"]}
+        for i in range(disposable)
+    ]
+    disposable_comments = [
+        {"uuid": uuid7(), "content": _text(i, 20), "post_uuid": post_rows[0]["uuid"], "author_uuid": user_rows[0]["uuid"]}
+        for i in range(disposable)
+    ]
+
+    async with async_session_factory() as session:
+        await session.exec(insert(User), params=user_rows)
+        if post_rows or disposable_posts:
+            await session.exec(insert(Post), params=post_rows + disposable_posts)
+        if comment_rows or disposable_comments:
+            await session.exec(insert(Comment), params=comment_rows + disposable_comments)
+        await session.commit()
+
+    dataset.users = [row["uuid"] for row in user_rows[:users]]
+    dataset.disposable_users = [row["uuid"] for row in user_rows[users:]]
+    dataset.posts = [row["uuid"] for row in post_rows]
+    dataset.disposable_posts = [row["uuid"] for row in disposable_posts]
+    dataset.comments = [row["uuid"] for row in comment_rows]
+    dataset.disposable_comments = [row["uuid"] for row in disposable_comments]
+    return dataset
+
+
+async def cleanup(dataset: Dataset):
+    # Covers the seed plus anything the write routes created during the run.
+    async with async_session_factory() as session:
+        users = select(User.uuid).where(User.username.startswith(dataset.username_prefix))
+        posts = select(Post.uuid).where(Post.author_uuid.in_(users))
+        await session.exec(delete(Comment).where(or_(Comment.author_uuid.in_(users), Comment.post_uuid.in_(posts))))
+        await session.exec(delete(Post).where(Post.author_uuid.in_(users)))
+        await session.exec(delete(UserDeletion).where(UserDeletion.user_uuid.in_(users)))
+        await session.exec(delete(User).where(User.uuid.in_(users)))
+        await session.commit()
@@ -0,0 +1,96 @@
+"""Compare POST /comments throughput and latency with and without group commit.
+
+    python -m app.bench.group_commit --requests 5000 --concurrency 200
+
+Seeds a throwaway dataset in the configured database and drives the route
+in-process through httpx's ASGI transport, first with one transaction per
+comment and then with `comment_batcher` running, and removes the dataset
+again. `--direct` skips HTTP and calls BlogCRUD.create_comment, which shows
+the database side on its own.
+"""
+import argparse
+import asyncio
+import sys
+from itertools import count
+from time import perf_counter
+
+from httpx import ASGITransport, AsyncClient
+
+from app import settings
+from app.bench.dataset import cleanup, seed
+from app.bench.runner import drive, summarize
+from app.bench.scenarios import SCENARIOS
+from app.blog.crud import BlogCRUD, comment_batcher
+from app.blog.models import CommentCreate
+from app.core.db import async_engine, async_session_factory
+from app.main import app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench.group_commit", description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000, help="comments per mode")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--direct", action="store_true", help="call BlogCRUD directly instead of the HTTP route")
+    return parser.parse_args(argv)
+
+
+async def drive_direct(dataset, requests: int, concurrency: int) -> dict:
+    numbers = count()
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for i in iter(lambda: next(numbers), None):
+            if i >= requests:
+                return
+            data = CommentCreate(content="bench", post_uuid=dataset.posts[i % len(dataset.posts)])
+            started = perf_counter()
+            try:
+                async with async_session_factory() as session:
+                    await BlogCRUD(session=session).create_comment(data, dataset.users[i % len(dataset.users)])
+            except Exception:
+                errors += 1
+            latencies.append((perf_counter() - started) * 1000)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, perf_counter() - started)
+
+
+async def main(args: argparse.Namespace):
+    dataset = await seed(users=10, posts_per_user=10, comments_per_post=0)
+    transport = ASGITransport(app=app)
+    base_url = f"http://bench{settings.api_v1_prefix}/blog"
+    results = {}
+    try:
+        async with AsyncClient(transport=transport, base_url=base_url) as client:
+            for mode in ("per-request", "group commit"):
+                if mode == "group commit":
+                    comment_batcher.start()
+                try:
+                    if args.direct:
+                        await drive_direct(dataset, args.concurrency, args.concurrency)  # warm up
+                        results[mode] = await drive_direct(dataset, args.requests, args.concurrency)
+                    else:
+                        scenario = SCENARIOS["POST /comments"]
+                        await drive(client, scenario, dataset, args.concurrency, args.concurrency)  # warm up
+                        results[mode] = await drive(client, scenario, dataset, args.requests, args.concurrency)
+                finally:
+                    await comment_batcher.stop()
+        print(f"{'mode':<16}{'comments/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}", file=sys.stdout)
+        for mode, result in results.items():
+            print(
+                f"{mode:<16}{result['throughput']:>12,.0f}{result['p50_ms']:>10.1f}"
+                f"{result['p99_ms']:>10.1f}{result['errors']:>8}",
+                file=sys.stdout
+            )
+        if comment_batcher.stats.batches:
+            stats = comment_batcher.stats
+            print(f"batches: {stats.batches}, avg {stats.rows / stats.batches:.1f} rows, max {stats.batch_size_max}", file=sys.stdout)
+    finally:
+        await cleanup(dataset)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,89 @@
+"""Compare insert cost and index size for random (v4) and time-ordered (v7) keys.
+
+    python -m app.bench.inserts --rows 200000 --batch 1000
+
+Builds scratch tables in a throwaway schema of the configured (migrated)
+database and inserts the same rows into each, one transaction per batch:
+
+    v4 pk+unique  gen_random_uuid() with the old extra unique index on uuid
+    v4 pk         gen_random_uuid(), primary key only
+    v7 pk         uuid_generate_v7(), primary key only
+
+For each it reports wall time, WAL bytes per row (write amplification) and
+the size of the uuid indexes (bloat from page splits).
+"""
+import argparse
+import asyncio
+import sys
+from time import perf_counter
+
+import asyncpg
+
+from app.core.db import db_connection_str
+from app.tools.ndjson_import import asyncpg_dsn
+
+SCHEMA = "bench_inserts"
+
+CONFIGS = (
+    ("v4 pk+unique", "gen_random_uuid()", True),
+    ("v4 pk", "gen_random_uuid()", False),
+    ("v7 pk", "uuid_generate_v7()", False),
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench.inserts", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000, help="rows per INSERT transaction")
+    parser.add_argument("--database-url", default=db_connection_str)
+    return parser.parse_args(argv)
+
+
+async def run_config(conn: asyncpg.Connection, name: str, default: str, extra_index: bool, rows: int, batch: int) -> dict:
+    table = f"{SCHEMA}.t_{name.replace(' ', '_').replace('+', '_')}"
+    await conn.execute(f"CREATE TABLE {table} (uuid uuid PRIMARY KEY DEFAULT {default}, payload text NOT NULL)")
+    if extra_index:
+        await conn.execute(f"CREATE UNIQUE INDEX ON {table} (uuid)")
+    try:
+        # Start every run from a fresh checkpoint so full-page writes count the same way.
+        await conn.execute("CHECKPOINT")
+    except asyncpg.InsufficientPrivilegeError:
+        pass
+
+    wal_start = await conn.fetchval("SELECT pg_current_wal_lsn()")
+    started = perf_counter()
+    for offset in range(0, rows, batch):
+        await conn.execute(
+            f"INSERT INTO {table} (payload) SELECT md5(i::text) FROM generate_series($1::int, $2::int) AS i",
+            offset, min(offset + batch, rows) - 1
+        )
+    elapsed = perf_counter() - started
+    wal_bytes = await conn.fetchval("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), $1)", wal_start)
+    index_bytes = await conn.fetchval("SELECT pg_indexes_size($1::regclass)", table)
+    return {
+        "rows_per_second": rows / elapsed,
+        "wal_bytes_per_row": float(wal_bytes) / rows,
+        "index_mb": index_bytes / 1024 / 1024,
+    }
+
+
+async def main(args: argparse.Namespace):
+    conn = await asyncpg.connect(asyncpg_dsn(args.database_url))
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+        print(f"{'keys':<16}{'rows/s':>12}{'WAL B/row':>12}{'index MB':>12}", file=sys.stdout)
+        for name, default, extra_index in CONFIGS:
+            result = await run_config(conn, name, default, extra_index, args.rows, args.batch)
+            print(
+                f"{name:<16}{result['rows_per_second']:>12,.0f}{result['wal_bytes_per_row']:>12,.1f}"
+                f"{result['index_mb']:>12,.1f}",
+                file=sys.stdout
+            )
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
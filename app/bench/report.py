@@ -0,0 +1,47 @@
+import json
+import sys
+from typing import IO, List
+
+
+def write_json(path: str, results: dict):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load_json(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Return one line per route whose throughput or p95 regressed beyond `threshold`.
+
+    `threshold` is relative (0.1 = 10%). Routes missing from either run are
+    skipped, so adding a scenario never fails against an older baseline.
+    """
+    regressions = []
+    for name, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if before is None:
+            continue
+        if now["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {now['throughput']:,.1f}/s vs baseline {before['throughput']:,.1f}/s"
+            )
+        if now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {now['p95_ms']:.2f}ms vs baseline {before['p95_ms']:.2f}ms"
+            )
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{name}: {now['errors']} errors vs baseline {before['errors']}")
+    return regressions
+
+
+def print_table(results: dict, out: IO = sys.stdout):
+    print(f"{'route':<50}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}", file=out)
+    for name, route in results["routes"].items():
+        print(
+            f"{name:<50}{route['throughput']:>10,.1f}{route['p50_ms']:>10.2f}"
+            f"{route['p95_ms']:>10.2f}{route['p99_ms']:>10.2f}{route['errors']:>8}",
+            file=out
+        )
@@ -0,0 +1,59 @@
+"""Compare requests/sec per read route with and without fast JSON responses.
+
+    python -m app.bench.responses --requests 2000 --concurrency 20
+
+Seeds a throwaway dataset in the configured database, drives each route
+in-process through httpx's ASGI transport with `fast_json_responses` off and
+then on, and removes the dataset again.
+"""
+import argparse
+import asyncio
+import sys
+
+from httpx import ASGITransport, AsyncClient
+
+from app import settings
+from app.bench.dataset import cleanup, seed
+from app.bench.runner import drive
+from app.bench.scenarios import SCENARIOS
+from app.core.db import async_engine
+from app.main import app
+
+ROUTES = (
+    "GET /users/{user_uuid}",
+    "GET /posts/{post_uuid}",
+    "GET /posts",
+    "GET /posts/{post_uuid}/comments",
+    "GET /comments/{comment_uuid}",
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench.responses", description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route and mode")
+    parser.add_argument("--concurrency", type=int, default=20)
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace):
+    dataset = await seed(users=10, posts_per_user=10, comments_per_post=20)
+    transport = ASGITransport(app=app)
+    base_url = f"http://bench{settings.api_v1_prefix}/blog"
+    try:
+        async with AsyncClient(transport=transport, base_url=base_url) as client:
+            print(f"{'route':<40}{'validated':>12}{'fast':>12}{'speedup':>10}", file=sys.stdout)
+            for name in ROUTES:
+                results = []
+                for fast in (False, True):
+                    settings.fast_json_responses = fast
+                    await drive(client, SCENARIOS[name], dataset, args.concurrency, args.concurrency)  # warm up
+                    results.append((await drive(client, SCENARIOS[name], dataset, args.requests, args.concurrency))["throughput"])
+                validated, fast = results
+                print(f"{name:<40}{validated:>10,.0f}/s{fast:>10,.0f}/s{fast / validated:>9.2f}x", file=sys.stdout)
+    finally:
+        await cleanup(dataset)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
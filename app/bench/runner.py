@@ -0,0 +1,96 @@
+import asyncio
+from itertools import count
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from httpx import AsyncClient
+
+from app.bench.dataset import Dataset
+from app.bench.scenarios import Scenario
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open.
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile over an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def histogram(latencies_ms: List[float]) -> dict:
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for value in latencies_ms:
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return {"le_ms": list(HISTOGRAM_BUCKETS_MS) + ["+Inf"], "counts": counts}
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies_ms)
+    total = len(ordered)
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(ordered) / total if total else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "histogram": histogram(ordered),
+    }
+
+
+async def drive(
+    client: AsyncClient,
+    scenario: Scenario,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    numbers: Optional[count] = None
+) -> dict:
+    """Send `requests` requests from `concurrency` workers; 4xx/5xx count as errors."""
+    numbers = numbers if numbers is not None else count()
+    remaining = iter(range(requests))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, path, kwargs = scenario(dataset, next(numbers))
+            started = perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, perf_counter() - started)
+
+
+async def run(
+    client: AsyncClient,
+    scenarios: Dict[str, Scenario],
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    warmup: int = 0
+) -> Dict[str, dict]:
+    results = {}
+    for name, scenario in scenarios.items():
+        # Warm-up and measured requests share one numbering so destructive
+        # routes never reuse a row.
+        numbers = count()
+        if warmup:
+            await drive(client, scenario, dataset, warmup, concurrency, numbers)
+        results[name] = await drive(client, scenario, dataset, requests, concurrency, numbers)
+    return results
@@ -0,0 +1,74 @@
+from typing import Callable, Dict, Tuple
+
+from app.bench.dataset import Dataset
+
+# A scenario turns (dataset, request number) into (method, path, httpx kwargs).
+Request = Tuple[str, str, dict]
+Scenario = Callable[[Dataset, int], Request]
+
+
+def _pick(items: list, i: int):
+    return items[i % len(items)]
+
+
+def _take(items: list, i: int):
+    # Destructive routes consume one disposable row per request.
+    if i >= len(items):
+        raise ValueError("Not enough disposable rows seeded; raise --requests or the disposable count")
+    return items[i]
+
+
+# One entry per route in app/blog/api.py, plus the ?expand= variants.
+SCENARIOS: Dict[str, Scenario] = {
+    "POST /users": lambda ds, i: ("POST", "/users", {"json": {
+        "username": f"{ds.username_prefix}new-{i}",
+        "email": f"{ds.username_prefix}new-{i}@example.com",
+        "password": "benchPassword1",
+    }}),
+    "GET /users/{user_uuid}": lambda ds, i: ("GET", f"/users/{_pick(ds.users, i)}", {}),
+    "PATCH /users/{user_uuid}": lambda ds, i: ("PATCH", f"/users/{_pick(ds.users, i)}", {"json": {
+        "username": f"{ds.username_prefix}renamed-{i}",
+    }}),
+    "DELETE /users/{user_uuid}": lambda ds, i: ("DELETE", f"/users/{_take(ds.disposable_users, i)}", {}),
+    "GET /users/{user_uuid}/posts": lambda ds, i: ("GET", f"/users/{_pick(ds.users, i)}/posts", {}),
+    "GET /posts": lambda ds, i: ("GET", "/posts", {}),
+    "GET /posts?expand=author,comments": lambda ds, i: ("GET", "/posts", {"params": {"expand": "author,comments"}}),
+    "POST /posts": lambda ds, i: ("POST", "/posts", {
+        "params": {"author_uuid": str(_pick(ds.users, i))},
+        "json": {"title": f"Bench post {i}", "content": "Written by the benchmark."},
+    }),
+    "POST /posts:batch": lambda ds, i: ("POST", "/posts:batch", {
+        "params": {"author_uuid": str(_pick(ds.users, i))},
+        "json": {"items": [{"title": f"Bench post {i}.{n}", "content": "Batched."} for n in range(20)]},
+    }),
+    "GET /posts/search": lambda ds, i: ("GET", "/posts/search", {"params": {"q": "postgres cache"}}),
+    "GET /posts/{post_uuid}": lambda ds, i: ("GET", f"/posts/{_pick(ds.posts, i)}", {}),
+    "GET /posts/{post_uuid}?expand=author,comments": lambda ds, i: (
+        "GET", f"/posts/{_pick(ds.posts, i)}", {"params": {"expand": "author,comments"}}
+    ),
+    "GET /posts/{post_uuid}/comments": lambda ds, i: ("GET", f"/posts/{_pick(ds.posts, i)}/comments", {}),
+    "PATCH /posts/{post_uuid}": lambda ds, i: ("PATCH", f"/posts/{_pick(ds.posts, i)}", {"json": {
+        "title": f"Edited {i}",
+    }}),
+    "DELETE /posts/{post_uuid}": lambda ds, i: ("DELETE", f"/posts/{_take(ds.disposable_posts, i)}", {}),
+    "POST /comments": lambda ds, i: ("POST", "/comments", {
+        "params": {"author_uuid": str(_pick(ds.users, i))},
+        "json": {"content": f"Bench comment {i}", "post_uuid": str(_pick(ds.posts, i))},
+    }),
+    "POST /comments:batch": lambda ds, i: ("POST", "/comments:batch", {
+        "params": {"author_uuid": str(_pick(ds.users, i))},
+        "json": {"items": [
+            {"content": f"Bench comment {i}.{n}", "post_uuid": str(_pick(ds.posts, i + n))} for n in range(20)
+        ]},
+    }),
+    "GET /comments/{comment_uuid}": lambda ds, i: ("GET", f"/comments/{_pick(ds.comments, i)}", {}),
+    "GET /comments/{comment_uuid}?expand=author,post": lambda ds, i: (
+        "GET", f"/comments/{_pick(ds.comments, i)}", {"params": {"expand": "author,post"}}
+    ),
+    "PATCH /comments/{comment_uuid}": lambda ds, i: ("PATCH", f"/comments/{_pick(ds.comments, i)}", {"json": {
+        "content": f"Edited {i}",
+    }}),
+    "DELETE /comments/{comment_uuid}": lambda ds, i: ("DELETE", f"/comments/{_take(ds.disposable_comments, i)}", {}),
+    "GET /export/posts": lambda ds, i: ("GET", "/export/posts", {}),
+    "GET /export/comments": lambda ds, i: ("GET", "/export/comments", {}),
+}
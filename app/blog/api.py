@@ -1,13 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.blog.crud import BlogCRUD
 from app.blog.dependencies import get_blog_crud
-from app.blog.models import UserCreate, UserRead, UserUpdate, PostCreate, PostRead, PostUpdate, CommentCreate, CommentRead
-from app.core.models import StatusMessage
+from app.blog.export import export_statement, stream_ndjson
+from app.blog.purge import purge_worker
+from app import settings
+from app.blog.models import (
+    BatchCreate, BatchResult,
+    UserCreate, UserRead, UserUpdate,
+    PostCreate, PostRead, PostReadExpanded, PostPage, PostSearchPage, PostUpdate,
+    CommentCreate, CommentRead, CommentReadExpanded, CommentPage, CommentUpdate
+)
+from app.core.conditional import is_conditional, is_not_modified, make_etag, not_modified_response, set_validators
+from app.core.models import Comment, Post, StatusMessage, User
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.responses import fast_response, to_dict, to_dicts
 
 router = APIRouter()
 
+async def check_not_modified(request: Request, crud: BlogCRUD, model, kind: str, uuid: str) -> Optional[Response]:
+    if not is_conditional(request):
+        return None
+    updated_at = await crud.get_updated_at(model, uuid)
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+    etag = make_etag(kind, uuid, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+    return None
+
+def add_validators(response: Response, kind: str, obj):
+    set_validators(response, make_etag(kind, obj.uuid, obj.updated_at), obj.updated_at)
+
+def use_fast_json(fields: set = frozenset()) -> bool:
+    # Expanded responses are built as pydantic models anyway; only plain
+    # rows take the fast path.
+    return settings.fast_json_responses and not fields
+
+def object_response(obj, model, response: Optional[Response] = None, status_code: int = http_status.HTTP_200_OK):
+    return fast_response(to_dict(obj, model), status_code=status_code, response=response)
+
+def page_response(rows: list, model, next_cursor: Optional[str]):
+    return fast_response({"items": to_dicts(rows, model), "next_cursor": next_cursor})
+
+POST_EXPANSIONS = {"author", "comments"}
+COMMENT_EXPANSIONS = {"author", "post"}
+
+def parse_expand(expand: Optional[str], allowed: set) -> set:
+    if not expand:
+        return set()
+    fields = {field.strip() for field in expand.split(",") if field.strip()}
+    unknown = fields - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand {', '.join(sorted(unknown))}; allowed: {', '.join(sorted(allowed))}"
+        )
+    return fields
+
+def validate_batch(batch: BatchCreate, model) -> tuple:
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=http_status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {settings.batch_max_items} items"
+        )
+    valid, errors = [], []
+    for index, item in enumerate(batch.items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors.append({"index": index, "detail": e.errors(include_url=False)})
+    return valid, errors
+
+def check_batch_errors(errors: list, continue_on_error: bool):
+    if errors and not continue_on_error:
+        raise HTTPException(
+            status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+
+def batch_result(total: int, valid: list, uuids: list, errors: list) -> dict:
+    result = [None] * total
+    for (index, _), uuid in zip(valid, uuids):
+        result[index] = uuid
+    return {"uuids": result, "errors": errors}
+
 # User endpoints
 @router.post(
     "/users",  
@@ -19,6 +103,8 @@ async def create_user(
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
     user = await crud.create_user(data=data)
+    if use_fast_json():
+        return object_response(user, UserRead, status_code=http_status.HTTP_201_CREATED)
     return user
 
 @router.get(
@@ -27,12 +113,20 @@ async def create_user(
     status_code=http_status.HTTP_200_OK
 )
 async def get_user_by_id(
-    user_uuid: str, 
+    user_uuid: str,
+    request: Request,
+    response: Response,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
+    not_modified = await check_not_modified(request, crud, User, "user", user_uuid)
+    if not_modified is not None:
+        return not_modified
     user = await crud.get_user(user_uuid=user_uuid)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    add_validators(response, "user", user)
+    if use_fast_json():
+        return object_response(user, UserRead, response)
     return user
 
 @router.patch(
@@ -60,9 +154,49 @@ async def delete_user_by_id(
     deleted = await crud.delete_user(user_uuid=user_uuid)
     if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
+    purge_worker.wake()
     return {"status": True, "message": "User has been deleted!"}
 
+@router.get(
+    "/users/{user_uuid}/posts",
+    response_model=PostPage,
+    response_model_exclude_unset=True,
+    status_code=http_status.HTTP_200_OK
+)
+async def list_posts_by_user(
+    user_uuid: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    fields = parse_expand(expand, POST_EXPANSIONS)
+    posts, next_cursor = await crud.list_posts(limit=limit, cursor=cursor, author_uuid=user_uuid)
+    if use_fast_json(fields):
+        return page_response(posts, PostRead, next_cursor)
+    items = await crud.expand_posts(posts, fields)
+    return {"items": items, "next_cursor": next_cursor}
+
 # Post endpoints
+@router.get(
+    "/posts",
+    response_model=PostPage,
+    response_model_exclude_unset=True,
+    status_code=http_status.HTTP_200_OK
+)
+async def list_posts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    fields = parse_expand(expand, POST_EXPANSIONS)
+    posts, next_cursor = await crud.list_posts(limit=limit, cursor=cursor)
+    if use_fast_json(fields):
+        return page_response(posts, PostRead, next_cursor)
+    items = await crud.expand_posts(posts, fields)
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.post(
     "/posts",
     response_model=PostRead,
@@ -74,21 +208,88 @@ async def create_post(
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
     post = await crud.create_post(data=data, author_uuid=author_uuid)
+    if use_fast_json():
+        return object_response(post, PostRead, status_code=http_status.HTTP_201_CREATED)
     return post
 
+@router.post(
+    "/posts:batch",
+    response_model=BatchResult,
+    status_code=http_status.HTTP_201_CREATED
+)
+async def create_posts_batch(
+    batch: BatchCreate,
+    author_uuid: str,
+    continue_on_error: bool = False,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    valid, errors = validate_batch(batch, PostCreate)
+    check_batch_errors(errors, continue_on_error)
+    uuids = await crud.create_posts(items=[item for _, item in valid], author_uuid=author_uuid)
+    return batch_result(len(batch.items), valid, uuids, errors)
+
+@router.get(
+    "/posts/search",
+    response_model=PostSearchPage,
+    status_code=http_status.HTTP_200_OK
+)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    hits, next_cursor = await crud.search_posts(q=q, limit=limit, cursor=cursor)
+    return {"items": hits, "next_cursor": next_cursor}
+
 @router.get(
     "/posts/{post_uuid}",
-    response_model=PostRead,
+    response_model=PostReadExpanded,
+    response_model_exclude_unset=True,
     status_code=http_status.HTTP_200_OK
 )
 async def get_post_by_id(
     post_uuid: str,
+    request: Request,
+    response: Response,
+    expand: Optional[str] = None,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
+    fields = parse_expand(expand, POST_EXPANSIONS)
+    # Validators only cover the post row itself, not expanded relationships.
+    if not fields:
+        not_modified = await check_not_modified(request, crud, Post, "post", post_uuid)
+        if not_modified is not None:
+            return not_modified
     post = await crud.get_post(post_uuid=post_uuid)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    if not fields:
+        add_validators(response, "post", post)
+    if use_fast_json(fields):
+        return object_response(post, PostRead, response)
+    [expanded] = await crud.expand_posts([post], fields)
+    return expanded
+
+@router.get(
+    "/posts/{post_uuid}/comments",
+    response_model=CommentPage,
+    response_model_exclude_unset=True,
+    status_code=http_status.HTTP_200_OK
+)
+async def list_comments_by_post(
+    post_uuid: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    fields = parse_expand(expand, COMMENT_EXPANSIONS)
+    comments, next_cursor = await crud.list_comments(post_uuid=post_uuid, limit=limit, cursor=cursor)
+    if use_fast_json(fields):
+        return page_response(comments, CommentRead, next_cursor)
+    items = await crud.expand_comments(comments, fields)
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.patch(
     "/posts/{post_uuid}",
@@ -125,25 +326,64 @@ async def delete_post_by_id(
 )
 async def create_comment(
     data: CommentCreate,
-    author_uuid: str,
+    author_uuid: UUID,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
     comment = await crud.create_comment(data=data, author_uuid=author_uuid)
+    if use_fast_json():
+        return object_response(comment, CommentRead, status_code=http_status.HTTP_201_CREATED)
     return comment
 
+@router.post(
+    "/comments:batch",
+    response_model=BatchResult,
+    status_code=http_status.HTTP_201_CREATED
+)
+async def create_comments_batch(
+    batch: BatchCreate,
+    author_uuid: UUID,
+    continue_on_error: bool = False,
+    crud: BlogCRUD = Depends(get_blog_crud)
+):
+    valid, errors = validate_batch(batch, CommentCreate)
+    existing = await crud.existing_post_uuids({item.post_uuid for _, item in valid})
+    for index, item in valid:
+        if item.post_uuid not in existing:
+            errors.append({"index": index, "detail": "Post not found!"})
+    valid = [(index, item) for index, item in valid if item.post_uuid in existing]
+    errors.sort(key=lambda error: error["index"])
+    check_batch_errors(errors, continue_on_error)
+    uuids = await crud.create_comments(items=[item for _, item in valid], author_uuid=author_uuid)
+    return batch_result(len(batch.items), valid, uuids, errors)
+
 @router.get(
     "/comments/{comment_uuid}",
-    response_model=CommentRead,
+    response_model=CommentReadExpanded,
+    response_model_exclude_unset=True,
     status_code=http_status.HTTP_200_OK
 )
 async def get_comment_by_id(
     comment_uuid: str,
+    request: Request,
+    response: Response,
+    expand: Optional[str] = None,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
+    fields = parse_expand(expand, COMMENT_EXPANSIONS)
+    # Validators only cover the comment row itself, not expanded relationships.
+    if not fields:
+        not_modified = await check_not_modified(request, crud, Comment, "comment", comment_uuid)
+        if not_modified is not None:
+            return not_modified
     comment = await crud.get_comment(comment_uuid=comment_uuid)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    return comment
+    if not fields:
+        add_validators(response, "comment", comment)
+    if use_fast_json(fields):
+        return object_response(comment, CommentRead, response)
+    [expanded] = await crud.expand_comments([comment], fields)
+    return expanded
 
 @router.patch(
     "/comments/{comment_uuid}",
@@ -152,7 +392,7 @@ async def get_comment_by_id(
 )
 async def update_comment_by_id(
     comment_uuid: str,
-    data: CommentCreate,
+    data: CommentUpdate,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
     comment = await crud.update_comment(comment_uuid=comment_uuid, data=data)
@@ -167,6 +407,37 @@ async def delete_comment_by_id(
     comment_uuid: str,
     crud: BlogCRUD = Depends(get_blog_crud)
 ):
-    await crud.delete_comment(comment_uuid=comment_uuid)
+    deleted = await crud.delete_comment(comment_uuid=comment_uuid)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Comment not found")
     return {"status": True, "message": "Comment has been deleted"}
 
+# Export endpoints
+@router.get(
+    "/export/{kind}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    status_code=http_status.HTTP_200_OK
+)
+async def export_ndjson(
+    kind: Literal["posts", "comments"],
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after_created_at: Optional[datetime] = None,
+    after_uuid: Optional[UUID] = None
+):
+    # Rows stream oldest first; resume an interrupted export by passing the
+    # created_at and uuid of the last line received.
+    if (after_created_at is None) != (after_uuid is None):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="after_created_at and after_uuid must be given together"
+        )
+    statement = export_statement(
+        kind,
+        created_from=created_from,
+        created_to=created_to,
+        after_created_at=after_created_at,
+        after_uuid=after_uuid
+    )
+    return StreamingResponse(stream_ndjson(statement), media_type="application/x-ndjson")
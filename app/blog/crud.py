@@ -1,35 +1,99 @@
-from uuid import UUID
+from typing import List, Optional, Tuple, Union
+from datetime import datetime
+from uuid import UUID, uuid4
 from fastapi import HTTPException
 from fastapi import status as http_status
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, exists, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-import bcrypt
+from sqlalchemy.orm import aliased
 
-from app.blog.models import UserBase, UserCreate, UserUpdate, PostBase, PostCreate, PostUpdate, CommentBase, CommentCreate
-from app.core.models import User, Post, Comment
+from app import settings
+from app.blog.models import (
+    UserBase, UserCached, UserCreate, UserRead, UserUpdate,
+    PostBase, PostCreate, PostRead, PostReadExpanded, PostSearchHit, PostUpdate,
+    CommentBase, CommentCreate, CommentRead, CommentReadExpanded, CommentUpdate
+)
+from app.core.batching import WriteBatcher, WriteBatcherBusy
+from app.core.cache import ReadThroughCache, object_cache
+from app.core.db import async_session_factory
+from app.core.ids import uuid7
+from app.core.models import User, Post, Comment, UserDeletion, live
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_rank_cursor, encode_rank_cursor, keyset_page, next_cursor
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.core.singleflight import SingleFlight, read_flights
+
+def cache_key(kind: str, uuid) -> str:
+    # Normalise so "ABC..." and "abc..." share one entry and one invalidation.
+    try:
+        return f"{kind}:{UUID(str(uuid))}"
+    except ValueError:
+        return f"{kind}:{uuid}"
+
+POST_NOT_FOUND = "Post not found!"
+USER_NOT_FOUND = "User not found!"
+
+async def insert_comment_rows(rows: List[dict]) -> List[Union[Comment, str]]:
+    # Flush for comment_batcher: one multi-row INSERT ... RETURNING and one
+    # commit for the whole batch. Rows for missing (or tombstoned) posts or
+    # authors are left out up front and come back as their 404 detail, so
+    # one bad row doesn't fail everybody else's insert.
+    async with async_session_factory() as session:
+        result = await session.exec(
+            select(Post.uuid).where(Post.uuid.in_({row["post_uuid"] for row in rows}), *live(Post))
+        )
+        posts = set(result.scalars().all())
+        result = await session.exec(
+            select(User.uuid).where(User.uuid.in_({row["author_uuid"] for row in rows}), *live(User))
+        )
+        authors = set(result.scalars().all())
+        rejected = {
+            row["uuid"]: POST_NOT_FOUND if row["post_uuid"] not in posts else USER_NOT_FOUND
+            for row in rows if row["post_uuid"] not in posts or row["author_uuid"] not in authors
+        }
+        valid = [row for row in rows if row["uuid"] not in rejected]
+        comments = {}
+        if valid:
+            result = await session.exec(insert(Comment).returning(Comment), params=valid)
+            comments = {comment.uuid: comment for comment in result.scalars().all()}
+            await session.commit()
+    return [comments.get(row["uuid"]) or rejected[row["uuid"]] for row in rows]
+
+comment_batcher = WriteBatcher(
+    insert_comment_rows,
+    max_rows=settings.comment_batch_size,
+    max_delay=settings.comment_batch_delay,
+    max_queue=settings.comment_batch_max_queue,
+)
 
 class BlogCRUD:
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        cache: ReadThroughCache = object_cache,
+        flights: SingleFlight = read_flights
+    ):
         self.session = session
+        self.cache = cache
+        self.flights = flights
 
     # User endpoints
     async def create_user(self, data: UserCreate) -> UserBase:
-        hashed_password = bcrypt.hashpw(data.password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = await self._hash_password(data.password)
 
-        user = User(
+        statement = insert(User).values(
             username=data.username,
             email=data.email,
-            hashed_password=hashed_password.decode('utf-8') 
-        )
-        self.session.add(user)
+            hashed_password=hashed_password
+        ).returning(User)
+        result = await self.session.exec(statement)
+        user = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(user)
         return user
     
-    async def get_user(self, user_uuid: str) -> UserBase:
-        statement = select(User).where(User.uuid == user_uuid)
-        result = await self.session.exec(statement)
-        user = result.scalar_one_or_none()
+    async def get_user(self, user_uuid: str) -> UserCached:
+        key = cache_key("user", user_uuid)
+        user = await self.cache.get_or_load(key, UserCached, lambda: self._load_cached_user(key, user_uuid))
         if user is None:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
@@ -37,43 +101,171 @@ class BlogCRUD:
             )
         return user
     
+    async def _load_cached_user(self, key: str, user_uuid: str) -> Optional[UserCached]:
+        # Project before caching so hashed_password never reaches a shared store.
+        user = await self._get_by_uuid(key, User, user_uuid)
+        return None if user is None else UserCached.model_validate(user)
+
     async def update_user(self, user_uuid: str, data: UserUpdate) -> UserBase:
-        statement = select(User).where(User.uuid == user_uuid)
-        result = await self.session.exec(statement)
-        user = result.scalar_one_or_none()
-        if user is None:
-            raise HTTPException(
-                status_code=http_status.HTTP_404_NOT_FOUND,
-                detail="User not found!"
-            )
         update_data = data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(user, key, value)
-
-        self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        password = update_data.pop("password", None)
+        if password is not None:
+            update_data["hashed_password"] = await self._hash_password(password)
+        user = await self._update_returning(User, user_uuid, update_data, "User not found!")
+        await self._invalidate(cache_key("user", user_uuid))
         return user
     
     async def delete_user(self, user_uuid: str) -> bool:
-        statement = delete(User).where(User.uuid == user_uuid)
-        if await self.session.exec(statement):
-            await self.session.commit()
-            return True
-        return False
-    
+        # Only tombstone the account here; its posts and comments are removed
+        # in bounded batches by purge_deleted_user so one prolific author
+        # can't turn into a single huge, lock-heavy transaction.
+        result = await self.session.exec(
+            update(User)
+            .where(User.uuid == user_uuid, User.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow())
+            .returning(User.uuid)
+        )
+        deleted = result.scalar_one_or_none()
+        if deleted is None:
+            await self.session.rollback()
+            return False
+        await self.session.exec(
+            pg_insert(UserDeletion).values(user_uuid=deleted).on_conflict_do_nothing()
+        )
+        # live() hides the user's posts and comments, and comments on those
+        # posts, from now on; their cache entries have to go too.
+        keys = []
+        if self.cache.enabled:
+            posts = select(Post.uuid).where(Post.author_uuid == deleted)
+            result = await self.session.exec(
+                select(Comment.uuid).where(or_(Comment.author_uuid == deleted, Comment.post_uuid.in_(posts)))
+            )
+            keys += [cache_key("comment", uuid) for uuid in result.scalars().all()]
+            result = await self.session.exec(posts)
+            keys += [cache_key("post", uuid) for uuid in result.scalars().all()]
+        await self.session.commit()
+        await self._invalidate(cache_key("user", user_uuid), *keys)
+        return True
+
+    async def purge_deleted_user(self, batch_size: int) -> Optional[int]:
+        """Delete one batch of a deleted user's content.
+
+        Comments by the user go first, then other users' comments on the
+        user's posts, then the posts and finally the user row. Returns the
+        number of rows removed, or None when there is nothing to purge.
+        """
+        result = await self.session.exec(
+            select(UserDeletion)
+            .where(UserDeletion.finished_at.is_(None))
+            .order_by(UserDeletion.requested_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            await self.session.rollback()
+            return None
+        user_uuid = job.user_uuid
+
+        post_uuids = select(Post.uuid).where(Post.author_uuid == user_uuid)
+        comments = []
+        for condition in (Comment.author_uuid == user_uuid, Comment.post_uuid.in_(post_uuids)):
+            batch = select(Comment.uuid).where(condition).limit(batch_size)
+            result = await self.session.exec(
+                delete(Comment)
+                .where(Comment.uuid.in_(batch))
+                .returning(Comment.uuid, Comment.post_uuid, Comment.author_uuid)
+            )
+            comments = result.all()
+            if comments:
+                break
+
+        deleted_posts = []
+        if not comments:
+            batch = post_uuids.limit(batch_size)
+            result = await self.session.exec(delete(Post).where(Post.uuid.in_(batch)).returning(Post.uuid))
+            deleted_posts = result.scalars().all()
+
+        finished = not comments and not deleted_posts
+        if finished:
+            # Anything written since the last batch goes with the user row
+            # through the ON DELETE CASCADE foreign keys.
+            await self.session.exec(delete(User).where(User.uuid == user_uuid))
+            job.finished_at = datetime.utcnow()
+        job.comments_deleted += len(comments)
+        job.posts_deleted += len(deleted_posts)
+        await self.session.commit()
+
+        await self._invalidate(
+            *(cache_key("post", uuid) for uuid in deleted_posts),
+            *self._comment_keys(comments)
+        )
+        return len(comments) + len(deleted_posts) + finished
+
+    async def purge_tombstones(self, batch_size: int, older_than: datetime) -> Optional[int]:
+        """Physically delete one batch of rows tombstoned before `older_than`.
+
+        Tombstoned comments go first, then the comments left on tombstoned
+        posts, then those posts once they have none. Returns the number of
+        rows removed, or None when there is nothing to purge.
+        """
+        expired_posts = select(Post.uuid).where(Post.deleted_at < older_than)
+        for batch in (
+            select(Comment.uuid).where(Comment.deleted_at < older_than).limit(batch_size),
+            select(Comment.uuid).where(Comment.post_uuid.in_(expired_posts)).limit(batch_size),
+        ):
+            result = await self.session.exec(delete(Comment).where(Comment.uuid.in_(batch)).returning(Comment.uuid))
+            removed = result.scalars().all()
+            if removed:
+                await self.session.commit()
+                return len(removed)
+
+        # Posts still holding comments (written since the last batch) wait
+        # for the next round rather than cascading an unbounded delete.
+        batch = expired_posts.where(~exists().where(Comment.post_uuid == Post.uuid)).limit(batch_size)
+        result = await self.session.exec(delete(Post).where(Post.uuid.in_(batch)).returning(Post.uuid))
+        removed = result.scalars().all()
+        await self.session.commit()
+        return len(removed) or None
+
     # Post endpoints
     async def create_post(self, data: PostCreate, author_uuid: str) -> PostBase:
-        post = Post(title=data.title, content=data.content, author_uuid=author_uuid)
-        self.session.add(post)
+        await self._require_user(author_uuid)
+        statement = insert(Post).values(
+            title=data.title,
+            content=data.content,
+            author_uuid=author_uuid
+        ).returning(Post)
+        result = await self.session.exec(statement)
+        post = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(post)
+        await self._invalidate(cache_key("user", author_uuid))
         return post
     
+    async def create_posts(self, items: List[PostCreate], author_uuid: str) -> List[UUID]:
+        await self._require_user(author_uuid)
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "uuid": uuid7(),
+                "title": item.title,
+                "content": item.content,
+                "author_uuid": author_uuid,
+                "created_at": created_at
+            }
+            for item in items
+        ]
+        if rows:
+            # executemany is batched into multi-row INSERTs by the driver,
+            # all inside one transaction.
+            await self.session.exec(insert(Post), params=rows)
+            await self.session.commit()
+            await self._invalidate(cache_key("user", author_uuid))
+        return [row["uuid"] for row in rows]
+    
     async def get_post(self, post_uuid: str) -> PostBase:
-        statement = select(Post).where(Post.uuid == post_uuid)
-        result = await self.session.exec(statement)
-        post = result.scalar_one_or_none()
+        key = cache_key("post", post_uuid)
+        post = await self.cache.get_or_load(key, Post, lambda: self._get_by_uuid(key, Post, post_uuid))
         if post is None:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
@@ -81,42 +273,141 @@ class BlogCRUD:
             )
         return post
     
-    async def update_post(self, post_uuid: str, data: PostUpdate) -> PostBase:
-        statement = select(Post).where(Post.uuid == post_uuid)
+    async def list_posts(
+        self, limit: int, cursor: Optional[str] = None, author_uuid: Optional[str] = None
+    ) -> Tuple[List[PostBase], Optional[str]]:
+        statement = self._live(select(Post), Post)
+        if author_uuid is not None:
+            statement = statement.where(Post.author_uuid == author_uuid)
+        statement = keyset_page(statement, Post, limit, cursor)
         result = await self.session.exec(statement)
-        post = result.scalar_one_or_none()
-        if post is None:
-            raise HTTPException(
-                status_code=http_status.HTTP_404_NOT_FOUND,
-                detail="Post not found!"
-            )
-        update_data = data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(post, key, value)
+        posts = result.scalars().all()
+        return posts[:limit], next_cursor(posts, limit)
+    
+    async def search_posts(
+        self, q: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[PostSearchHit], Optional[str]]:
+        search_vector = Post.__table__.c.search_vector
+        query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(search_vector, query)
 
-        self.session.add(post)
-        await self.session.commit()
-        await self.session.refresh(post)
+        # Rank and page over the GIN index match first, then load rows and
+        # build snippets (ts_headline is expensive) for the page only.
+        matches = select(Post.uuid, rank.label("rank")).where(search_vector.op("@@")(query), *live(Post))
+        if cursor is not None:
+            cursor_rank, cursor_uuid = decode_rank_cursor(cursor)
+            matches = matches.where(tuple_(rank, Post.uuid) < tuple_(literal(cursor_rank), cursor_uuid))
+        matches = matches.order_by(rank.desc(), Post.uuid.desc()).limit(limit + 1).subquery()
+
+        snippet = func.ts_headline(
+            "english", Post.content, query, "MaxFragments=2, MinWords=5, MaxWords=20"
+        )
+        statement = (
+            select(Post, matches.c.rank, snippet.label("snippet"))
+            .join(matches, matches.c.uuid == Post.uuid)
+            .order_by(matches.c.rank.desc(), Post.uuid.desc())
+        )
+        result = await self.session.exec(statement)
+        rows = result.all()
+
+        hits = [
+            PostSearchHit(**PostRead.model_validate(post).model_dump(), rank=rank, snippet=snippet)
+            for post, rank, snippet in rows[:limit]
+        ]
+        next_page = None
+        if len(rows) > limit:
+            next_page = encode_rank_cursor(hits[-1].rank, hits[-1].uuid)
+        return hits, next_page
+    
+    async def update_post(self, post_uuid: str, data: PostUpdate) -> PostBase:
+        update_data = data.model_dump(exclude_unset=True)
+        post = await self._update_returning(Post, post_uuid, update_data, "Post not found!")
+        await self._invalidate(cache_key("post", post_uuid))
         return post
     
     async def delete_post(self, post_uuid: str) -> bool:
-        statement = delete(Post).where(Post.uuid == post_uuid)
+        # A single-row tombstone; the comments are hidden along with the post
+        # and physically removed later by purge_tombstones.
+        statement = (
+            update(Post)
+            .where(Post.uuid == post_uuid, Post.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow())
+            .returning(Post.author_uuid)
+        )
         result = await self.session.exec(statement)
+        author_uuids = result.scalars().all()
+        # Only read for cache invalidation: the hidden comments' entries and
+        # their authors' counters.
+        comments = []
+        if author_uuids:
+            result = await self.session.exec(
+                select(Comment.uuid, Comment.post_uuid, Comment.author_uuid)
+                .where(Comment.post_uuid == post_uuid, Comment.deleted_at.is_(None))
+            )
+            comments = result.all()
         await self.session.commit()
-        return result.rowcount > 0
+
+        await self._invalidate(
+            cache_key("post", post_uuid),
+            *(cache_key("user", uuid) for uuid in author_uuids),
+            *self._comment_keys(comments)
+        )
+        return bool(author_uuids)
     
     # Comment endpoints
     async def create_comment(self, data: CommentCreate, author_uuid: str) -> CommentBase:
-        comment = Comment(content=data.content, post_id=data.post_id, author_uuid=author_uuid)
-        self.session.add(comment)
-        await self.session.commit()
-        await self.session.refresh(comment)
+        if comment_batcher.running:
+            comment = await self._submit_comment(data, author_uuid)
+        else:
+            # Inserted only if the post and the author are live, in the same
+            # round trip; nothing returned means one of them isn't.
+            row = select(
+                literal(data.content).label("content"),
+                literal(data.post_uuid).label("post_uuid"),
+                literal(author_uuid, User.uuid.type).label("author_uuid")
+            ).where(
+                exists(select(Post.uuid).where(Post.uuid == data.post_uuid, *live(Post))),
+                exists(select(User.uuid).where(User.uuid == author_uuid, *live(User)))
+            )
+            statement = insert(Comment).from_select(["content", "post_uuid", "author_uuid"], row).returning(Comment)
+            result = await self.session.exec(statement)
+            comment = result.scalar_one_or_none()
+            if comment is None:
+                await self.session.rollback()
+                posts = await self.existing_post_uuids({data.post_uuid})
+                raise HTTPException(
+                    status_code=http_status.HTTP_404_NOT_FOUND,
+                    detail=USER_NOT_FOUND if posts else POST_NOT_FOUND
+                )
+            await self.session.commit()
+        await self._invalidate(cache_key("post", comment.post_uuid), cache_key("user", author_uuid))
         return comment
 
+    async def create_comments(self, items: List[CommentCreate], author_uuid: str) -> List[UUID]:
+        await self._require_user(author_uuid)
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "uuid": uuid7(),
+                "content": item.content,
+                "post_uuid": item.post_uuid,
+                "author_uuid": author_uuid,
+                "created_at": created_at
+            }
+            for item in items
+        ]
+        if rows:
+            await self.session.exec(insert(Comment), params=rows)
+            await self.session.commit()
+            await self._invalidate(
+                cache_key("user", author_uuid),
+                *{cache_key("post", row["post_uuid"]) for row in rows}
+            )
+        return [row["uuid"] for row in rows]
+
     async def get_comment(self, comment_uuid: str) -> CommentBase:
-        statement = select(Comment).where(Comment.id == comment_uuid)
-        result = await self.session.exec(statement)
-        comment = result.scalar_one_or_none()
+        key = cache_key("comment", comment_uuid)
+        comment = await self.cache.get_or_load(key, Comment, lambda: self._get_by_uuid(key, Comment, comment_uuid))
         if comment is None:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
@@ -124,27 +415,231 @@ class BlogCRUD:
             )
         return comment
     
-    async def update_comment(self, comment_uuid: str, data: CommentCreate) -> CommentBase:
-        statement = select(Comment).where(Comment.uuid == comment_uuid)
+    async def list_comments(
+        self, post_uuid: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[CommentBase], Optional[str]]:
+        statement = self._live(select(Comment).where(Comment.post_uuid == post_uuid), Comment)
+        statement = keyset_page(statement, Comment, limit, cursor)
         result = await self.session.exec(statement)
-        comment = result.scalar_one_or_none()
-        if comment is None:
-            raise HTTPException(
-                status_code=http_status.HTTP_404_NOT_FOUND,
-                detail="Comment not found!"
-            )
-        
+        comments = result.scalars().all()
+        return comments[:limit], next_cursor(comments, limit)
+    
+    async def update_comment(self, comment_uuid: str, data: CommentUpdate) -> CommentBase:
         update_data = data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(comment, key, value)
-
-        self.session.add(comment)
-        await self.session.commit()
-        await self.session.refresh(comment)
+        comment = await self._update_returning(Comment, comment_uuid, update_data, "Comment not found!")
+        await self._invalidate(cache_key("comment", comment_uuid))
         return comment
     
     async def delete_comment(self, comment_uuid: str) -> bool:
-        statement = delete(Comment).where(Comment.uuid == comment_uuid)
-        await self.session.exec(statement)
+        statement = (
+            self._live(update(Comment).where(Comment.uuid == comment_uuid), Comment)
+            .values(deleted_at=datetime.utcnow())
+            .returning(Comment.uuid, Comment.post_uuid, Comment.author_uuid)
+        )
+        result = await self.session.exec(statement)
+        comments = result.all()
         await self.session.commit()
-        return True
+        await self._invalidate(cache_key("comment", comment_uuid), *self._comment_keys(comments))
+        return bool(comments)
+
+    # Relationship expansion: one query per expanded relationship, however
+    # many rows are being expanded.
+    async def expand_posts(self, posts: List[Post], expand: set) -> List[PostReadExpanded]:
+        # Relationship fields are only set when expanded, so routes using
+        # response_model_exclude_unset leave them out otherwise.
+        related = {}
+        if "author" in expand:
+            authors = await self._load_users({post.author_uuid for post in posts})
+            related["author"] = lambda post: authors.get(post.author_uuid)
+        if "comments" in expand:
+            comments = await self._load_comments_by_post({post.uuid for post in posts})
+            related["comments"] = lambda post: comments.get(post.uuid, [])
+        return [
+            PostReadExpanded(
+                **PostRead.model_validate(post).model_dump(),
+                **{field: load(post) for field, load in related.items()}
+            )
+            for post in posts
+        ]
+
+    async def expand_comments(self, comments: List[Comment], expand: set) -> List[CommentReadExpanded]:
+        related = {}
+        if "author" in expand:
+            authors = await self._load_users({comment.author_uuid for comment in comments})
+            related["author"] = lambda comment: authors.get(comment.author_uuid)
+        if "post" in expand:
+            posts = await self._load_posts({comment.post_uuid for comment in comments})
+            related["post"] = lambda comment: posts.get(comment.post_uuid)
+        return [
+            CommentReadExpanded(
+                **CommentRead.model_validate(comment).model_dump(),
+                **{field: load(comment) for field, load in related.items()}
+            )
+            for comment in comments
+        ]
+
+    async def _load_users(self, user_uuids: set) -> dict:
+        if not user_uuids:
+            return {}
+        result = await self.session.exec(self._live(select(User).where(User.uuid.in_(user_uuids)), User))
+        return {user.uuid: UserRead.model_validate(user) for user in result.scalars().all()}
+
+    async def _load_posts(self, post_uuids: set) -> dict:
+        if not post_uuids:
+            return {}
+        result = await self.session.exec(self._live(select(Post).where(Post.uuid.in_(post_uuids)), Post))
+        return {post.uuid: PostRead.model_validate(post) for post in result.scalars().all()}
+
+    async def _load_comments_by_post(self, post_uuids: set) -> dict:
+        if not post_uuids:
+            return {}
+        # Newest comments per post, capped with a window function so a single
+        # busy post can't blow up the response.
+        rank = func.row_number().over(
+            partition_by=Comment.post_uuid,
+            order_by=(Comment.created_at.desc(), Comment.uuid.desc())
+        ).label("rank")
+        ranked = select(Comment, rank).where(Comment.post_uuid.in_(post_uuids), Comment.deleted_at.is_(None)).subquery()
+        comment = aliased(Comment, ranked)
+        statement = (
+            select(comment)
+            .where(ranked.c.rank <= settings.expand_comments_limit)
+            .order_by(ranked.c.rank)
+        )
+        result = await self.session.exec(statement)
+        comments = {}
+        for row in result.scalars().all():
+            comments.setdefault(row.post_uuid, []).append(CommentRead.model_validate(row))
+        return comments
+
+    async def get_updated_at(self, model, uuid: str) -> Optional[datetime]:
+        # Cheap version lookup for conditional GETs; avoids loading the row.
+        statement = self._live(select(model.updated_at).where(model.uuid == uuid), model)
+        result = await self.session.exec(statement)
+        updated_at = result.scalar_one_or_none()
+        # Hand the connection back before the coalesced load checks out its
+        # own; holding both lets a few concurrent requests exhaust the pool.
+        await self.session.rollback()
+        return updated_at
+
+    # Warmup
+    async def prime_statements(self):
+        """Run the hot read queries once on this session's connection so that
+        asyncpg has them prepared and SQLAlchemy has them compiled."""
+        missing = uuid4()
+        for model in (User, Post, Comment):
+            await self._load_by_uuid(self.session, model, missing)
+            await self.get_updated_at(model, missing)
+        await self.list_posts(limit=DEFAULT_PAGE_SIZE)
+        await self.list_posts(limit=DEFAULT_PAGE_SIZE, author_uuid=missing)
+        await self.list_comments(post_uuid=missing, limit=DEFAULT_PAGE_SIZE)
+        await self.session.rollback()
+
+    # Helpers
+    async def _get_by_uuid(self, key: str, model, uuid: str):
+        if not self.flights.enabled:
+            return await self._load_by_uuid(self.session, model, uuid)
+
+        # Coalesced loads run on their own session so that no single
+        # request's session (or its cancellation) is shared with the others.
+        async def load():
+            async with async_session_factory() as session:
+                return await self._load_by_uuid(session, model, uuid)
+
+        return await self.flights.do(key, load)
+
+    async def _load_by_uuid(self, session: AsyncSession, model, uuid: str):
+        statement = self._live(select(model).where(model.uuid == uuid), model)
+        result = await session.exec(statement)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def _live(statement, model):
+        # Tombstoned rows are only kept around for the purge worker.
+        return statement.where(*live(model))
+
+    async def _invalidate(self, *keys: str):
+        self.flights.forget(*keys)
+        await self.cache.invalidate(*keys)
+
+    @staticmethod
+    def _comment_keys(comments) -> set:
+        # Deleting a comment changes its post's and author's counters too.
+        keys = set()
+        for uuid, post_uuid, author_uuid in comments:
+            keys.update((
+                cache_key("comment", uuid), cache_key("post", post_uuid), cache_key("user", author_uuid)
+            ))
+        return keys
+
+    async def _update_returning(self, model, uuid: str, values: dict, not_found_detail: str):
+        # A single UPDATE ... RETURNING round trip; an empty RETURNING
+        # result means no row matched the uuid.
+        if not values:
+            statement = self._live(select(model).where(model.uuid == uuid), model)
+        else:
+            statement = (
+                self._live(update(model).where(model.uuid == uuid), model)
+                .values(**values)
+                .returning(model)
+                .execution_options(populate_existing=True)
+            )
+        result = await self.session.exec(statement)
+        obj = result.scalar_one_or_none()
+        if obj is None:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail=not_found_detail
+            )
+        await self.session.commit()
+        return obj
+
+    async def existing_post_uuids(self, post_uuids: set) -> set:
+        if not post_uuids:
+            return set()
+        statement = self._live(select(Post.uuid).where(Post.uuid.in_(post_uuids)), Post)
+        result = await self.session.exec(statement)
+        return set(result.scalars().all())
+
+    async def _require_user(self, user_uuid: str):
+        statement = self._live(select(User.uuid).where(User.uuid == user_uuid), User)
+        result = await self.session.exec(statement)
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail="User not found!"
+            )
+
+    async def _submit_comment(self, data: CommentCreate, author_uuid: str) -> Comment:
+        row = {
+            "uuid": uuid7(),
+            "content": data.content,
+            "post_uuid": data.post_uuid,
+            "author_uuid": author_uuid,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            comment = await comment_batcher.submit(row)
+        except WriteBatcherBusy:
+            raise HTTPException(
+                status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many comments being written, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+        if isinstance(comment, str):
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail=comment
+            )
+        return comment
+
+    async def _hash_password(self, password: str) -> str:
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent signups, try again shortly",
+                headers={"Retry-After": "1"}
+            )
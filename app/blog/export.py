@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+import orjson
+from sqlalchemy import select, tuple_
+
+from app import settings
+from app.core.db import async_session_factory
+from app.core.models import Comment, Post, live
+
+# Exported columns, selected as plain rows so no ORM objects are built.
+# asyncpg returns its own UUID subclass, which orjson hands to `default=str`.
+EXPORT_COLUMNS = {
+    "posts": (Post, (Post.uuid, Post.title, Post.content, Post.author_uuid, Post.created_at, Post.updated_at)),
+    "comments": (Comment, (Comment.uuid, Comment.content, Comment.post_uuid, Comment.author_uuid,
+                           Comment.created_at, Comment.updated_at)),
+}
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Columns are naive UTC timestamps; asyncpg rejects aware values for them.
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def export_statement(
+    kind: str,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after_created_at: Optional[datetime] = None,
+    after_uuid: Optional[UUID] = None
+):
+    model, columns = EXPORT_COLUMNS[kind]
+    created_from, created_to, after_created_at = map(naive_utc, (created_from, created_to, after_created_at))
+    statement = select(*columns).where(*live(model))
+    if created_from is not None:
+        statement = statement.where(model.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(model.created_at < created_to)
+    if after_created_at is not None:
+        statement = statement.where(
+            tuple_(model.created_at, model.uuid) > tuple_(after_created_at, after_uuid)
+        )
+    return statement.order_by(model.created_at, model.uuid)
+
+
+async def stream_ndjson(statement) -> AsyncIterator[bytes]:
+    # The request's session is closed before a streaming body is sent, so the
+    # export opens its own and reads through a server-side cursor.
+    async with async_session_factory() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=settings.export_batch_size)
+        )
+        async for rows in result.mappings().partitions():
+            yield b"".join(
+                orjson.dumps(dict(row), default=str, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+            )
@@ -1,6 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from pydantic import EmailStr
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from uuid import UUID
 
@@ -11,7 +11,12 @@ class UserBase(SQLModel):
     email: EmailStr
 
 class UserRead(UserBase, UUIDModel):
-    pass
+    post_count: int = 0
+    comment_count: int = 0
+
+class UserCached(UserRead):
+    # What the object cache keeps for a user: never the password hash.
+    updated_at: datetime
 
 class UserCreate(UserBase):
     password: str
@@ -27,7 +32,7 @@ class PostBase(SQLModel):
     author_uuid: UUID = Field(foreign_key="user.uuid")
 
 class PostRead(PostBase, UUIDModel, TimestampModel):
-    pass
+    comment_count: int = 0
 
 class PostCreate(SQLModel):
     title: str = Field(nullable=False, max_length=255)
@@ -39,11 +44,52 @@ class PostUpdate(SQLModel):
 
 class CommentBase(SQLModel):
     content: str = Field(nullable=False, max_length=1024)
-    author_id: UUID = Field(foreign_key="user.uuid")
-    post_id: UUID = Field(foreign_key="post.uuid")
+    post_uuid: UUID = Field(foreign_key="posts.uuid")
 
 class CommentRead(CommentBase, UUIDModel, TimestampModel):
-    pass
+    author_uuid: UUID
 
 class CommentCreate(CommentBase):
     pass
+
+class CommentUpdate(SQLModel):
+    content: Optional[str] = None
+
+# Read models with optional relationships, filled in only when requested
+# through ?expand=
+class PostReadExpanded(PostRead):
+    author: Optional[UserRead] = None
+    comments: Optional[List[CommentRead]] = None
+
+class CommentReadExpanded(CommentRead):
+    author: Optional[UserRead] = None
+    post: Optional[PostRead] = None
+
+class PostPage(SQLModel):
+    items: List[PostReadExpanded]
+    next_cursor: Optional[str] = None
+
+class CommentPage(SQLModel):
+    items: List[CommentReadExpanded]
+    next_cursor: Optional[str] = None
+
+class PostSearchHit(PostRead):
+    rank: float
+    snippet: str
+
+class PostSearchPage(SQLModel):
+    items: List[PostSearchHit]
+    next_cursor: Optional[str] = None
+
+class BatchCreate(SQLModel):
+    # Items are validated one by one so that a bad item can be reported
+    # on its own instead of failing the whole request.
+    items: List[Dict[str, Any]]
+
+class BatchItemError(SQLModel):
+    index: int
+    detail: Any
+
+class BatchResult(SQLModel):
+    uuids: List[Optional[UUID]]
+    errors: List[BatchItemError] = []
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app import settings
+from app.blog.crud import BlogCRUD
+from app.core.db import async_session_factory
+from app.core.idempotency import idempotency_store
+
+logger = logging.getLogger("app.purge")
+
+
+class PurgeStats:
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+        }
+
+
+class PurgeWorker:
+    """Background task that physically removes deleted data in bounded batches:
+    first deleted users' content, then posts and comments whose tombstones
+    are older than `retention`, then expired idempotency keys.
+
+    Progress lives in the database (user_deletions and the tombstones
+    themselves), so a restart simply picks up where it stopped; SKIP LOCKED
+    lets several processes share the user jobs.
+    """
+
+    def __init__(self, batch_size: int, pause: float, poll_interval: float, retention: float):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.poll_interval = poll_interval
+        self.retention = timedelta(seconds=retention)
+        self.stats = PurgeStats()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wake.set()
+
+    async def run_once(self) -> Optional[int]:
+        async with async_session_factory() as session:
+            crud = BlogCRUD(session)
+            removed = await crud.purge_deleted_user(self.batch_size)
+            if removed is None:
+                removed = await crud.purge_tombstones(self.batch_size, datetime.utcnow() - self.retention)
+        if removed is None and idempotency_store is not None:
+            removed = await idempotency_store.purge_expired(self.batch_size) or None
+        if removed is not None:
+            self.stats.batches += 1
+            self.stats.rows += removed
+        return removed
+
+    async def _run(self):
+        while True:
+            # Cleared before looking so a wake() during the batch isn't lost.
+            self._wake.clear()
+            try:
+                removed = await self.run_once()
+            except Exception:
+                self.stats.errors += 1
+                logger.exception("purge batch failed")
+                removed = None
+            if removed is not None:
+                # Throttle so the purge never monopolises the pool or the WAL.
+                await asyncio.sleep(self.pause)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+purge_worker = PurgeWorker(
+    settings.purge_batch_size, settings.purge_pause, settings.purge_poll_interval, settings.purge_retention
+)
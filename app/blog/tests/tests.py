@@ -1,9 +1,42 @@
+import asyncio
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import asyncpg
+import orjson
 import pytest
-from httpx import AsyncClient
-from sqlalchemy import insert, select, delete
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, func, insert, select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession as SQLModelAsyncSession
 
-from app.core.models import User, Post
+from app import settings
+from app.bench.dataset import cleanup, seed
+from app.bench.report import compare
+from app.bench.runner import percentile, run
+from app.bench.scenarios import SCENARIOS
+from app.blog.api import router as blog_router
+from app.blog.crud import BlogCRUD, comment_batcher
+from app.blog.models import CommentCreate, PostUpdate
+from app.core.admission import AdmissionClass, pool_pressure, write_admission
+from app.core.batching import WriteBatcher, WriteBatcherBusy
+from app.core.cache import CacheBackend, LRUCache, LocalKeyValueStore, NullCache, ReadThroughCache, SharedCache, build_cache_backend
+from app.core.compression import CompressionMiddleware, available_encodings, negotiate, zstandard
+from app.core.db import async_engine, async_session_factory, db_connection_str
+from app.core.idempotency import IdempotencyStore, MemoryIdempotencyStore
+from app.core.ids import uuid7
+from app.core.models import User, Post, Comment, UserDeletion
+from app.core.querystats import QueryStats, RepeatedQueryError
+from app.core.security import PasswordHasher, PasswordHasherBusy, password_hasher
+from app.core.singleflight import SingleFlight
+from app.main import create_app
+from app.tools.ndjson_import import asyncpg_dsn, import_ndjson
+from app.tools.recount import recount
 
 # fixtures
 
@@ -21,7 +54,8 @@ async def test_user(async_session: AsyncSession):
     
     yield user_uuid
 
-    # Delete all posts for the user first
+    # Delete all comments and posts for the user first
+    await async_session.exec(delete(Comment).where(Comment.author_uuid == user_uuid))
     await async_session.exec(delete(Post).where(Post.author_uuid == user_uuid))
     await async_session.commit()
 
@@ -41,9 +75,25 @@ async def test_post(async_session: AsyncSession, test_user):
     await async_session.commit()
     post_uuid = result.inserted_primary_key[0]
     yield post_uuid
+    await async_session.exec(delete(Comment).where(Comment.post_uuid == post_uuid))
     await async_session.exec(delete(Post).where(Post.uuid == post_uuid))
     await async_session.commit()
 
+@pytest.fixture
+async def test_comment(async_session: AsyncSession, test_user, test_post):
+    comment_data = {
+        "content": "Test Comment",
+        "author_uuid": test_user,
+        "post_uuid": test_post
+    }
+    comment_stmt = insert(Comment).values(comment_data)
+    result = await async_session.exec(comment_stmt)
+    await async_session.commit()
+    comment_uuid = result.inserted_primary_key[0]
+    yield comment_uuid
+    await async_session.exec(delete(Comment).where(Comment.uuid == comment_uuid))
+    await async_session.commit()
+
 # tests
 
 @pytest.mark.asyncio
@@ -145,12 +195,56 @@ async def test_delete_user(
     for k, v in want.items():
         assert got[k] == v
 
+    # Tombstoned right away; the row itself goes with the background purge.
+    response = await async_client.get(f"/users/{user_uuid}")
+    assert response.status_code == 404
+    response = await async_client.delete(f"/users/{user_uuid}")
+    assert response.status_code == 404
+
+    crud = BlogCRUD(session=async_session)
+    while await crud.purge_deleted_user(batch_size=100) is not None:
+        pass
+
     statement = select(User).where(User.uuid == user_uuid)
     results = await async_session.exec(statement)
     user = results.scalar_one_or_none()
 
     assert user is None
 
+@pytest.mark.asyncio
+async def test_purge_deleted_user_in_batches(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    doomed = (await async_session.exec(
+        insert(User).values(username="doomed", email="doomed@example.com", hashed_password="x").returning(User.uuid)
+    )).scalar_one()
+    posts = [{"uuid": uuid7(), "title": f"t{i}", "content": "c", "author_uuid": doomed} for i in range(3)]
+    await async_session.exec(insert(Post), params=posts)
+    await async_session.exec(insert(Comment), params=[
+        {"content": "c", "post_uuid": post["uuid"], "author_uuid": author}
+        for post in posts for author in (doomed, test_user)
+    ])
+    await async_session.commit()
+
+    response = await async_client.delete(f"/users/{doomed}")
+    assert response.status_code == 200
+    # Other users still see their counters until the purge gets to them.
+    survivor = (await async_session.exec(select(User).where(User.uuid == test_user))).scalar_one()
+    assert survivor.comment_count == 3
+
+    crud = BlogCRUD(session=async_session)
+    batches = []
+    while (removed := await crud.purge_deleted_user(batch_size=2)) is not None:
+        batches.append(removed)
+    assert max(batches) <= 2
+    # 3 own comments, 3 comments on the user's posts, 3 posts, then the user.
+    assert sum(batches) == 10
+
+    job = (await async_session.exec(select(UserDeletion).where(UserDeletion.user_uuid == doomed))).scalar_one()
+    assert (job.comments_deleted, job.posts_deleted) == (6, 3)
+    assert job.finished_at is not None
+    assert (await async_session.exec(select(User).where(User.uuid == doomed))).scalar_one_or_none() is None
+    await async_session.refresh(survivor)
+    assert survivor.comment_count == 0
+
 @pytest.mark.asyncio
 async def test_create_post(async_client: AsyncClient, async_session: AsyncSession, test_data: dict, test_user):
     payload = test_data["post_case_create"]["payload"]
@@ -205,9 +299,992 @@ async def test_delete_post_by_id(async_client: AsyncClient, async_session: Async
     want = test_data["post_case_delete"]["want"]
     
     assert got == want
-    
+
+    # A tombstone until the purge worker's retention window has passed.
+    response = await async_client.get(f"/posts/{test_post}")
+    assert response.status_code == 404
+    post = (await async_session.exec(select(Post).where(Post.uuid == test_post))).scalar_one()
+    assert post.deleted_at is not None
+
+    crud = BlogCRUD(session=async_session)
+    assert await crud.purge_tombstones(batch_size=100, older_than=post.deleted_at) is None
+    while await crud.purge_tombstones(batch_size=100, older_than=datetime.utcnow()) is not None:
+        pass
+
     statement = select(Post).where(Post.uuid == test_post)
     results = await async_session.exec(statement)
     post = results.scalar_one_or_none()
     
     assert post is None
+
+@pytest.mark.asyncio
+async def test_delete_comment_by_id(async_client: AsyncClient, test_comment):
+    response = await async_client.delete(f"/comments/{test_comment}")
+    assert response.status_code == 200
+    # Already tombstoned, or never there.
+    for comment in (test_comment, uuid4()):
+        response = await async_client.delete(f"/comments/{comment}")
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_update_user_password_is_hashed(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    test_user
+):
+    response = await async_client.patch(f"/users/{test_user}", json={"password": "newPassword456"})
+    assert response.status_code == 200
+    assert "password" not in response.json()
+
+    statement = select(User.hashed_password).where(User.uuid == test_user)
+    results = await async_session.exec(statement)
+    hashed_password = results.scalar_one()
+
+    assert hashed_password != "newPassword456"
+    assert await password_hasher.verify("newPassword456", hashed_password)
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated():
+    hasher = PasswordHasher(rounds=4, workers=1, max_queue=0)
+    first = asyncio.ensure_future(hasher.hash("first"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PasswordHasherBusy):
+        await hasher.hash("second")
+
+    assert await hasher.verify("first", await first)
+    assert hasher.stats.completed == 2
+    assert hasher.stats.rejected == 1
+    hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_update_post_not_found(async_client: AsyncClient, async_session: AsyncSession, test_data: dict):
+    payload = test_data["post_case_patch"]["payload"]
+    response = await async_client.patch(f"/posts/{uuid4()}", json=payload)
+
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_create_comment(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post):
+    payload = {"content": "Nice post!", "post_uuid": str(test_post)}
+    response = await async_client.post(f"/comments?author_uuid={test_user}", json=payload)
+
+    assert response.status_code == 201
+    got = response.json()
+    assert got["content"] == "Nice post!"
+    assert got["post_uuid"] == str(test_post)
+    assert got["author_uuid"] == str(test_user)
+
+    statement = select(Comment).where(Comment.uuid == got["uuid"])
+    results = await async_session.exec(statement)
+    assert results.scalar_one().content == "Nice post!"
+
+@pytest.mark.asyncio
+async def test_update_comment_by_id(async_client: AsyncClient, async_session: AsyncSession, test_comment):
+    response = await async_client.patch(f"/comments/{test_comment}", json={"content": "Edited"})
+
+    assert response.status_code == 200
+    assert response.json()["content"] == "Edited"
+
+    response = await async_client.get(f"/comments/{test_comment}")
+    assert response.status_code == 200
+    assert response.json()["content"] == "Edited"
+
+@pytest.mark.asyncio
+async def test_list_posts_pages_with_cursor(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    for i in range(5):
+        await async_session.exec(insert(Post).values(title=f"Post {i}", content="Paged", author_uuid=test_user))
+    await async_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get(f"/users/{test_user}/posts", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["uuid"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+    response = await async_client.get("/posts", params={"limit": 5})
+    assert response.status_code == 200
+    assert [item["uuid"] for item in response.json()["items"]] == seen
+
+@pytest.mark.asyncio
+async def test_list_comments_by_post(async_client: AsyncClient, async_session: AsyncSession, test_post, test_comment):
+    response = await async_client.get(f"/posts/{test_post}/comments")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["uuid"] for item in page["items"]] == [str(test_comment)]
+    assert page["next_cursor"] is None
+
+@pytest.mark.asyncio
+async def test_list_posts_invalid_cursor(async_client: AsyncClient, async_session: AsyncSession):
+    response = await async_client.get("/posts", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_posts_batch(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    items = [{"title": f"Batch {i}", "content": "Imported"} for i in range(50)]
+    response = await async_client.post(f"/posts:batch?author_uuid={test_user}", json={"items": items})
+
+    assert response.status_code == 201
+    got = response.json()
+    assert len(got["uuids"]) == 50
+    assert got["errors"] == []
+
+    statement = select(Post).where(Post.uuid.in_(got["uuids"]))
+    results = await async_session.exec(statement)
+    titles = {str(post.uuid): post.title for post in results.scalars().all()}
+    assert [titles[uuid] for uuid in got["uuids"]] == [item["title"] for item in items]
+
+@pytest.mark.asyncio
+async def test_create_posts_batch_rejects_invalid_item(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    items = [{"title": "Good", "content": "Fine"}, {"title": "Missing content"}]
+    response = await async_client.post(f"/posts:batch?author_uuid={test_user}", json={"items": items})
+
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+
+    statement = select(Post).where(Post.author_uuid == test_user)
+    results = await async_session.exec(statement)
+    assert results.scalars().all() == []
+
+@pytest.mark.asyncio
+async def test_create_comments_batch_continue_on_error(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post):
+    items = [
+        {"content": "First", "post_uuid": str(test_post)},
+        {"content": "Orphan", "post_uuid": str(uuid4())},
+        {"post_uuid": str(test_post)},
+        {"content": "Last", "post_uuid": str(test_post)},
+    ]
+    response = await async_client.post(
+        f"/comments:batch?author_uuid={test_user}&continue_on_error=true", json={"items": items}
+    )
+
+    assert response.status_code == 201
+    got = response.json()
+    assert [uuid is not None for uuid in got["uuids"]] == [True, False, False, True]
+    assert [error["index"] for error in got["errors"]] == [1, 2]
+
+    response = await async_client.post("/comments?author_uuid=not-a-uuid", json=items[0])
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_cached_post_is_invalidated_on_update(async_session: AsyncSession, test_post):
+    cache = ReadThroughCache(LRUCache(max_size=10, ttl=60))
+    crud = BlogCRUD(session=async_session, cache=cache)
+
+    first = await crud.get_post(str(test_post))
+    second = await crud.get_post(str(test_post).upper())
+    assert second.uuid == first.uuid == test_post
+    assert second.title == "Test Post"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    await crud.update_post(str(test_post), PostUpdate(title="Fresh Title"))
+    post = await crud.get_post(str(test_post))
+    assert post.title == "Fresh Title"
+    assert cache.stats.misses == 2
+
+@pytest.mark.asyncio
+async def test_lru_cache_evicts_and_expires():
+    cache = LRUCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert cache.stats.evictions == 1
+
+    expiring = LRUCache(max_size=2, ttl=0)
+    await expiring.set("a", 1)
+    assert await expiring.get("a") is None
+    assert expiring.stats.expirations == 1
+
+@pytest.mark.asyncio
+async def test_shared_cache_with_local_store():
+    cache = ReadThroughCache(SharedCache(client=LocalKeyValueStore(), ttl=60))
+    user = User(uuid=uuid4(), username="cached", email="cached@example.com", hashed_password="x")
+
+    async def load():
+        return user
+
+    assert (await cache.get_or_load("user:1", User, load)) is user
+    cached = await cache.get_or_load("user:1", User, load)
+    assert cached.uuid == user.uuid
+    assert cached.username == "cached"
+
+    await cache.invalidate("user:1")
+    assert await cache.backend.get("user:1") is None
+
+@pytest.mark.asyncio
+async def test_cached_users_leave_out_password_hash(async_session: AsyncSession, test_user):
+    store = LocalKeyValueStore()
+    crud = BlogCRUD(session=async_session, cache=ReadThroughCache(SharedCache(client=store, ttl=60)))
+    first = await crud.get_user(test_user)
+    cached = await crud.get_user(test_user)
+    assert cached.uuid == first.uuid == test_user and cached.updated_at == first.updated_at
+    assert crud.cache.stats.hits == 1
+    assert not hasattr(cached, "hashed_password")
+    assert all(b"fakehashedpassword" not in value for _, value in store._data.values())
+
+def test_cache_backend_must_implement_get_set_and_delete():
+    class GetOnly(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+def test_shared_cache_url_without_redis_is_a_config_error(monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "shared")
+    monkeypatch.setattr(settings, "cache_url", "redis://localhost:6379/0")
+    monkeypatch.setitem(sys.modules, "redis.asyncio", None)
+    with pytest.raises(RuntimeError, match="'redis' extra"):
+        build_cache_backend()
+
+@pytest.mark.asyncio
+async def test_shared_cache_drops_loads_that_race_other_workers():
+    store = LocalKeyValueStore()
+    worker_a = ReadThroughCache(SharedCache(client=store, ttl=60))
+    worker_b = ReadThroughCache(SharedCache(client=store, ttl=60))
+    old = User(uuid=uuid4(), username="old", email="old@example.com", hashed_password="x")
+    new = User(uuid=old.uuid, username="new", email="old@example.com", hashed_password="x")
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_load():
+        started.set()
+        await release.wait()
+        return old
+
+    async def load_new():
+        return new
+
+    # Worker A reads the old row, worker B's write and invalidation land,
+    # then A's load finishes and writes the old value back.
+    loading = asyncio.ensure_future(worker_a.get_or_load("user:1", User, slow_load))
+    await started.wait()
+    await worker_b.invalidate("user:1")
+    release.set()
+    assert (await loading).username == "old"
+    for worker in (worker_b, worker_a):
+        assert (await worker.get_or_load("user:1", User, load_new)).username == "new"
+
+@pytest.mark.asyncio
+async def test_conditional_get_holds_one_connection_at_a_time(async_session: AsyncSession, test_user, test_post, monkeypatch):
+    other_post = (await async_session.exec(
+        insert(Post).values(title="Other", content="Other", author_uuid=test_user).returning(Post.uuid)
+    )).scalar_one()
+    await async_session.commit()
+
+    engine = create_async_engine(db_connection_str, pool_size=2, max_overflow=0, pool_timeout=1)
+    factory = sessionmaker(bind=engine, class_=SQLModelAsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("app.blog.crud.async_session_factory", factory)
+    barrier = asyncio.Barrier(2)
+
+    async def conditional_get(post_uuid):
+        # check_not_modified's version lookup, then the coalesced load.
+        async with factory() as session:
+            crud = BlogCRUD(session=session, cache=ReadThroughCache(NullCache()), flights=SingleFlight())
+            assert await crud.get_updated_at(Post, post_uuid) is not None
+            await barrier.wait()
+            return await crud.get_post(post_uuid)
+
+    try:
+        posts = await asyncio.gather(conditional_get(test_post), conditional_get(other_post))
+    finally:
+        await engine.dispose()
+    assert [post.uuid for post in posts] == [test_post, other_post]
+
+@pytest.mark.asyncio
+async def test_get_post_conditional_requests(async_client: AsyncClient, async_session: AsyncSession, test_post):
+    response = await async_client.get(f"/posts/{test_post}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = await async_client.get(f"/posts/{str(test_post).upper()}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await async_client.get(f"/posts/{test_post}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = await async_client.patch(f"/posts/{test_post}", json={"title": "Changed"})
+    assert response.status_code == 200
+
+    response = await async_client.get(f"/posts/{test_post}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["title"] == "Changed"
+
+@pytest.mark.asyncio
+async def test_get_comment_conditional_not_found(async_client: AsyncClient, async_session: AsyncSession):
+    response = await async_client.get(f"/comments/{uuid4()}", headers={"If-None-Match": '"abc"'})
+
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_and_survives_cancellation():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.ensure_future(flights.do("post:1", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    release.set()
+
+    results = await asyncio.gather(*waiters[1:])
+    assert results == ["value"] * 4
+    assert waiters[0].cancelled()
+    assert calls == 1
+    assert flights.stats.coalesced == 4
+    assert len(flights) == 0
+
+@pytest.mark.asyncio
+async def test_concurrent_get_post_shares_one_query(async_session: AsyncSession, test_post):
+    flights = SingleFlight()
+    crud = BlogCRUD(session=async_session, flights=flights)
+
+    posts = await asyncio.gather(*(crud.get_post(str(test_post)) for _ in range(10)))
+
+    assert {post.uuid for post in posts} == {test_post}
+    assert flights.stats.flights == 1
+    assert flights.stats.coalesced == 9
+
+@pytest.mark.asyncio
+async def test_get_post_expand(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post, test_comment):
+    response = await async_client.get(f"/posts/{test_post}")
+    assert response.status_code == 200
+    assert "author" not in response.json()
+    assert "comments" not in response.json()
+
+    response = await async_client.get(f"/posts/{test_post}", params={"expand": "author,comments"})
+    assert response.status_code == 200
+    got = response.json()
+    assert got["author"]["uuid"] == str(test_user)
+    assert [comment["uuid"] for comment in got["comments"]] == [str(test_comment)]
+
+    response = await async_client.get(f"/comments/{test_comment}", params={"expand": "author,post"})
+    assert response.status_code == 200
+    got = response.json()
+    assert got["author"]["username"] == "test_user"
+    assert got["post"]["uuid"] == str(test_post)
+
+    response = await async_client.get(f"/posts/{test_post}", params={"expand": "likes"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_posts_expand_query_count_is_flat(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    for i in range(6):
+        result = await async_session.exec(
+            insert(Post).values(title=f"Post {i}", content="Expand", author_uuid=test_user).returning(Post.uuid)
+        )
+        post_uuid = result.scalar_one()
+        for j in range(2):
+            await async_session.exec(
+                insert(Comment).values(content=f"Comment {j}", author_uuid=test_user, post_uuid=post_uuid)
+            )
+    await async_session.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        counts = []
+        for limit in (2, 6):
+            statements.clear()
+            response = await async_client.get(
+                f"/users/{test_user}/posts", params={"limit": limit, "expand": "author,comments"}
+            )
+            assert response.status_code == 200
+            items = response.json()["items"]
+            assert len(items) == limit
+            assert all(item["author"]["uuid"] == str(test_user) for item in items)
+            assert all(len(item["comments"]) == 2 for item in items)
+            counts.append(len(statements))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    assert counts[0] == counts[1] == 3
+
+@pytest.mark.asyncio
+async def test_export_posts_ndjson_resumes(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    for i in range(5):
+        await async_session.exec(insert(Post).values(title=f"Export {i}", content="Snapshot", author_uuid=test_user))
+    await async_session.commit()
+
+    response = await async_client.get("/export/posts")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Export {i}" for i in range(5)]
+
+    last = rows[1]
+    response = await async_client.get(
+        "/export/posts", params={"after_created_at": last["created_at"], "after_uuid": last["uuid"]}
+    )
+    assert [json.loads(line)["uuid"] for line in response.text.splitlines()] == [row["uuid"] for row in rows[2:]]
+
+    response = await async_client.get("/export/posts", params={"after_uuid": last["uuid"]})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_comments_time_range(async_client: AsyncClient, async_session: AsyncSession, test_comment):
+    response = await async_client.get("/export/comments", params={"created_from": "2000-01-01T00:00:00"})
+    assert [json.loads(line)["uuid"] for line in response.text.splitlines()] == [str(test_comment)]
+
+    response = await async_client.get("/export/comments", params={"created_to": "2000-01-01T00:00:00"})
+    assert response.text == ""
+
+@pytest.mark.asyncio
+async def test_export_time_range_accepts_utc_offsets(async_client: AsyncClient, async_session: AsyncSession, test_comment):
+    response = await async_client.get("/export/comments", params={"created_from": "2000-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    created_at = datetime.fromisoformat(json.loads(response.text)["created_at"])
+
+    # The same instant written in +02:00 is compared as UTC.
+    local = (created_at + timedelta(hours=2)).isoformat() + "+02:00"
+    response = await async_client.get("/export/comments", params={"created_from": local})
+    assert [json.loads(line)["uuid"] for line in response.text.splitlines()] == [str(test_comment)]
+    response = await async_client.get("/export/comments", params={"created_to": local})
+    assert response.text == ""
+
+@pytest.mark.asyncio
+async def test_ndjson_import_merges_with_foreign_key_checks(async_session: AsyncSession):
+    user_uuid, post_uuid = uuid4(), uuid4()
+    users = [
+        {"uuid": str(user_uuid), "username": "imported", "email": "imported@example.com", "hashed_password": "prehashed"},
+        {"username": "plain", "email": "plain@example.com", "password": "plainPassword1"},
+    ]
+    posts = [
+        {"uuid": str(post_uuid), "title": "Imported", "content": "Body", "author_uuid": str(user_uuid),
+         "created_at": "2024-05-01T12:00:00Z"},
+        {"title": "Orphan", "content": "Body", "author_uuid": str(uuid4())},
+    ]
+    comments = [{"content": "Imported comment", "post_uuid": str(post_uuid), "author_uuid": str(user_uuid)}]
+
+    conn = await asyncpg.connect(asyncpg_dsn(db_connection_str))
+    try:
+        hasher = PasswordHasher(rounds=4, workers=1, max_queue=10)
+        stats = await import_ndjson(conn, "users", [orjson.dumps(row) for row in users], hasher=hasher)
+        assert (stats.inserted, stats.skipped) == (2, 0)
+        stats = await import_ndjson(conn, "posts", [orjson.dumps(row) for row in posts], chunk_size=1)
+        assert (stats.read, stats.inserted, stats.skipped) == (2, 1, 1)
+        stats = await import_ndjson(conn, "comments", [orjson.dumps(row) for row in comments])
+        assert stats.inserted == 1
+        # Re-running is a no-op thanks to ON CONFLICT, rows without a uuid
+        # included.
+        for kind, rows in (("users", users), ("posts", posts), ("comments", comments)):
+            stats = await import_ndjson(conn, kind, [orjson.dumps(row) for row in rows], hasher=hasher)
+            assert (stats.inserted, stats.skipped) == (0, len(rows))
+        hasher.shutdown()
+    finally:
+        await conn.close()
+
+    assert (await async_session.exec(select(func.count()).select_from(User))).scalar_one() == 2
+    assert (await async_session.exec(select(func.count()).select_from(Comment))).scalar_one() == 1
+    results = await async_session.exec(select(User).where(User.username == "plain"))
+    assert await password_hasher.verify("plainPassword1", results.scalar_one().hashed_password)
+    results = await async_session.exec(select(Post.created_at).where(Post.uuid == post_uuid))
+    assert results.scalar_one().isoformat() == "2024-05-01T12:00:00"
+
+    await async_session.exec(delete(Comment))
+    await async_session.exec(delete(Post))
+    await async_session.exec(delete(User))
+    await async_session.commit()
+
+@pytest.mark.asyncio
+async def test_search_posts(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    await async_session.exec(insert(Post).values(title="Postgres tuning", content="Indexes make queries fast.", author_uuid=test_user))
+    await async_session.exec(insert(Post).values(title="Gardening", content="Notes on tuning a postgres cluster.", author_uuid=test_user))
+    await async_session.exec(insert(Post).values(title="Cooking", content="Nothing relevant here.", author_uuid=test_user))
+    await async_session.commit()
+
+    response = await async_client.get("/posts/search", params={"q": "postgres", "limit": 1})
+    assert response.status_code == 200
+    page = response.json()
+    # Title matches are weighted above content matches.
+    assert [hit["title"] for hit in page["items"]] == ["Postgres tuning"]
+    assert page["next_cursor"] is not None
+
+    response = await async_client.get("/posts/search", params={"q": "postgres", "cursor": page["next_cursor"]})
+    page = response.json()
+    assert [hit["title"] for hit in page["items"]] == ["Gardening"]
+    assert "<b>postgres</b>" in page["items"][0]["snippet"]
+    assert page["next_cursor"] is None
+
+@pytest.mark.asyncio
+async def test_counters_follow_writes_and_invalidate_cache(async_session: AsyncSession, test_user, test_post, test_comment):
+    crud = BlogCRUD(session=async_session, cache=ReadThroughCache(LRUCache(max_size=10, ttl=60)))
+    assert (await crud.get_post(test_post)).comment_count == 1
+    user = await crud.get_user(test_user)
+    assert (user.post_count, user.comment_count) == (1, 1)
+
+    comment = await crud.create_comment(CommentCreate(content="Second", post_uuid=test_post), test_user)
+    await crud.create_comments([CommentCreate(content="Batch", post_uuid=test_post)] * 2, test_user)
+    assert (await crud.get_post(test_post)).comment_count == 4
+    await crud.delete_comment(comment.uuid)
+    assert (await crud.get_post(test_post)).comment_count == 3
+    assert (await crud.get_user(test_user)).comment_count == 3
+
+    await crud.delete_post(test_post)
+    user = await crud.get_user(test_user)
+    assert (user.post_count, user.comment_count) == (0, 0)
+
+@pytest.mark.asyncio
+async def test_recount_repairs_drifted_counters(async_session: AsyncSession, test_user, test_post, test_comment):
+    await async_session.exec(update(Post).values(comment_count=7))
+    await async_session.exec(update(User).values(post_count=0, comment_count=3))
+    await async_session.commit()
+
+    conn = await asyncpg.connect(asyncpg_dsn(db_connection_str))
+    try:
+        assert await recount(conn) == (1, 1)
+        assert await recount(conn) == (0, 0)
+    finally:
+        await conn.close()
+
+    post = (await async_session.exec(select(Post).where(Post.uuid == test_post).execution_options(populate_existing=True))).scalar_one()
+    user = (await async_session.exec(select(User).where(User.uuid == test_user).execution_options(populate_existing=True))).scalar_one()
+    assert post.comment_count == 1
+    assert (user.post_count, user.comment_count) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_tombstones_are_hidden_then_purged(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post, test_comment):
+    other = await async_client.post(f"/posts?author_uuid={test_user}", json={"title": "Kept", "content": "Still here"})
+    other = other.json()["uuid"]
+
+    assert (await async_client.delete(f"/posts/{test_post}")).status_code == 200
+    # Comments on a tombstoned post disappear with it.
+    assert (await async_client.get(f"/comments/{test_comment}")).status_code == 404
+    assert [post["uuid"] for post in (await async_client.get("/posts")).json()["items"]] == [other]
+    assert (await async_client.get(f"/posts/{test_post}/comments")).json()["items"] == []
+    export = await async_client.get("/export/comments")
+    assert export.content == b""
+    user = (await async_client.get(f"/users/{test_user}")).json()
+    assert (user["post_count"], user["comment_count"]) == (1, 0)
+
+    crud = BlogCRUD(session=async_session)
+    batches = []
+    while (removed := await crud.purge_tombstones(batch_size=1, older_than=datetime.utcnow())) is not None:
+        batches.append(removed)
+    assert batches == [1, 1]
+    assert (await async_session.exec(select(Comment).where(Comment.uuid == test_comment))).scalar_one_or_none() is None
+
+    # The purge removes rows that were already out of the counts.
+    conn = await asyncpg.connect(asyncpg_dsn(db_connection_str))
+    try:
+        assert await recount(conn) == (0, 0)
+    finally:
+        await conn.close()
+
+@pytest.mark.asyncio
+async def test_deleted_users_content_is_hidden_before_purge(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post, test_comment):
+    other_user = (await async_session.exec(
+        insert(User).values(username="other", email="other@example.com", hashed_password="x").returning(User.uuid)
+    )).scalar_one()
+    await async_session.commit()
+    kept = (await async_client.post(f"/posts?author_uuid={other_user}", json={"title": "Kept", "content": "Kept"})).json()["uuid"]
+    reply = (await async_client.post(f"/comments?author_uuid={other_user}", json={"content": "Hi", "post_uuid": str(test_post)})).json()["uuid"]
+    elsewhere = (await async_client.post(f"/comments?author_uuid={test_user}", json={"content": "Hi", "post_uuid": kept})).json()["uuid"]
+
+    crud = BlogCRUD(session=async_session, cache=ReadThroughCache(LRUCache(max_size=10, ttl=60)))
+    await crud.get_post(test_post)
+    await crud.get_comment(elsewhere)
+    assert await crud.delete_user(test_user)
+
+    # Everything the user wrote, and replies on their posts, is gone from
+    # every read path (the cache included) before the purge has run.
+    for load, uuid in ((crud.get_post, test_post), (crud.get_comment, elsewhere)):
+        with pytest.raises(HTTPException):
+            await load(uuid)
+    for comment in (test_comment, reply, elsewhere):
+        assert (await async_client.get(f"/comments/{comment}")).status_code == 404
+    assert (await async_client.get(f"/posts/{test_post}")).status_code == 404
+    assert [post["uuid"] for post in (await async_client.get("/posts")).json()["items"]] == [kept]
+    assert (await async_client.get(f"/posts/{kept}/comments")).json()["items"] == []
+    assert (await async_client.get("/posts/search", params={"q": "test post"})).json()["items"] == []
+    assert [json.loads(line)["uuid"] for line in (await async_client.get("/export/posts")).text.splitlines()] == [kept]
+    assert (await async_client.get("/export/comments")).content == b""
+    assert (await async_session.exec(select(func.count()).select_from(Comment))).scalar_one() == 3
+
+@pytest.mark.asyncio
+async def test_deleted_users_cannot_write(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    other_user = (await async_session.exec(
+        insert(User).values(username="other", email="other@example.com", hashed_password="x").returning(User.uuid)
+    )).scalar_one()
+    other_post = (await async_session.exec(
+        insert(Post).values(title="Other", content="Other", author_uuid=other_user).returning(Post.uuid)
+    )).scalar_one()
+    await async_session.commit()
+    assert await BlogCRUD(session=async_session).delete_user(test_user)
+
+    post = {"title": "Late", "content": "Late"}
+    responses = [
+        await async_client.post(f"/posts?author_uuid={test_user}", json=post),
+        await async_client.post(f"/posts:batch?author_uuid={test_user}", json={"items": [post]}),
+        await async_client.post(f"/comments?author_uuid={test_user}", json={"content": "Late", "post_uuid": str(other_post)}),
+    ]
+    assert [(response.status_code, response.json()["detail"]) for response in responses] == [(404, "User not found!")] * 3
+    assert (await async_session.exec(select(func.count()).select_from(Post))).scalar_one() == 1
+
+@pytest.mark.asyncio
+async def test_comment_batching_groups_concurrent_inserts(async_session: AsyncSession, test_user, test_post):
+    async def create(post_uuid):
+        async with async_session_factory() as session:
+            return await BlogCRUD(session=session).create_comment(
+                CommentCreate(content="Live", post_uuid=post_uuid), test_user
+            )
+
+    comment_batcher.start()
+    try:
+        batches = comment_batcher.stats.batches
+        results = await asyncio.gather(*(create(test_post) for _ in range(50)), create(uuid4()), return_exceptions=True)
+    finally:
+        await comment_batcher.stop()
+
+    *created, failed = results
+    # The bad post_uuid fails its own caller only.
+    assert isinstance(failed, HTTPException) and failed.status_code == 404
+    assert len({comment.uuid for comment in created}) == 50
+    assert all(comment.post_uuid == test_post for comment in created)
+    assert comment_batcher.stats.batches - batches < 10
+    post = (await async_session.exec(select(Post).where(Post.uuid == test_post))).scalar_one()
+    assert post.comment_count == 50
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batching", [False, True])
+async def test_comment_on_missing_post_or_author_is_404(async_session: AsyncSession, test_user, test_post, batching):
+    async def create(post_uuid, author_uuid):
+        async with async_session_factory() as session:
+            return await BlogCRUD(session=session).create_comment(
+                CommentCreate(content="Live", post_uuid=post_uuid), author_uuid
+            )
+
+    deleted = (await async_session.exec(
+        insert(Post).values(title="Gone", content="Gone", author_uuid=test_user, deleted_at=datetime.utcnow())
+    )).inserted_primary_key[0]
+    await async_session.commit()
+    if batching:
+        comment_batcher.start()
+    try:
+        retried = comment_batcher.stats.retried
+        results = await asyncio.gather(
+            create(test_post, test_user), create(uuid4(), test_user), create(deleted, test_user),
+            create(test_post, uuid4()), return_exceptions=True
+        )
+    finally:
+        if batching:
+            await comment_batcher.stop()
+
+    created, *failed = results
+    assert created.post_uuid == test_post
+    assert [(error.status_code, error.detail) for error in failed] == [
+        (404, "Post not found!"), (404, "Post not found!"), (404, "User not found!")
+    ]
+    # Bad rows are filtered out up front, not found by retrying the batch.
+    assert comment_batcher.stats.retried == retried
+
+@pytest.mark.asyncio
+async def test_write_batcher_splits_failed_batches_in_half():
+    flushes = []
+
+    async def flush(items):
+        flushes.append(len(items))
+        if 13 in items:
+            raise ValueError(items)
+        return items
+
+    batcher = WriteBatcher(flush, max_rows=16, max_delay=60, max_queue=16)
+    batcher.start()
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(16)), return_exceptions=True)
+    await batcher.stop()
+    assert isinstance(results.pop(13), ValueError)
+    assert results == [i for i in range(16) if i != 13]
+    # One bad item in 16 costs 2*log2(16) extra flushes, not 16.
+    assert flushes == [16, 8, 8, 4, 4, 2, 1, 1, 2]
+
+@pytest.mark.asyncio
+async def test_write_batcher_backpressure_and_drain():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = WriteBatcher(flush, max_rows=100, max_delay=60, max_queue=3)
+    batcher.start()
+    pending = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(WriteBatcherBusy):
+        await batcher.submit(3)
+    # Stopping flushes what is queued right away rather than after max_delay.
+    await asyncio.wait_for(batcher.stop(), 1)
+    assert [await future for future in pending] == [0, 2, 4]
+    assert flushed == [[0, 1, 2]]
+    with pytest.raises(RuntimeError):
+        await batcher.submit(4)
+
+@pytest.mark.asyncio
+async def test_fast_json_responses_match_validated_output(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post, test_comment, monkeypatch):
+    paths = [f"/users/{test_user}", f"/posts/{test_post}", f"/comments/{test_comment}", "/posts", f"/posts/{test_post}/comments"]
+    validated = [await async_client.get(path) for path in paths]
+
+    monkeypatch.setattr(settings, "fast_json_responses", True)
+    fast = [await async_client.get(path) for path in paths]
+
+    for want, got in zip(validated, fast):
+        assert got.status_code == want.status_code == 200
+        assert got.json() == want.json()
+        assert got.headers.get("etag") == want.headers.get("etag")
+    assert "hashed_password" not in fast[0].json()
+
+@pytest.mark.asyncio
+async def test_bench_covers_every_route_and_flags_regressions(async_client: AsyncClient, async_session: AsyncSession):
+    routes = {
+        f"{method} {route.path}" for route in blog_router.routes for method in route.methods
+    }
+    covered = {name.split("?")[0] for name in SCENARIOS} - {"GET /export/posts", "GET /export/comments"}
+    assert routes == covered | {"GET /export/{kind}"}
+
+    dataset = await seed(users=2, posts_per_user=2, comments_per_post=2, disposable=4)
+    try:
+        names = ["GET /posts/{post_uuid}", "DELETE /comments/{comment_uuid}"]
+        results = await run(async_client, {name: SCENARIOS[name] for name in names}, dataset, 3, 2, warmup=1)
+    finally:
+        await cleanup(dataset)
+    assert all(route["requests"] == 3 and route["errors"] == 0 for route in results.values())
+
+    baseline = {"routes": {name: dict(route) for name, route in results.items()}}
+    assert compare({"routes": results}, baseline, threshold=0.1) == []
+    baseline["routes"][names[0]]["throughput"] *= 2
+    assert len(compare({"routes": results}, baseline, threshold=0.1)) == 1
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+
+@pytest.mark.asyncio
+async def test_admission_queues_with_deadline_and_sheds_on_pool_wait():
+    admission = AdmissionClass("test", limit=1, max_queue=1, queue_timeout=0.05, max_pool_wait=0.5)
+    assert await admission.acquire()
+    queued = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    assert not await admission.acquire()  # queue full
+    admission.release()
+    assert await queued  # the slot is handed over in FIFO order
+    assert not await admission.acquire()  # waited past the deadline
+    # Waiters that timed out or were cancelled give their place back.
+    assert admission.stats.waiting == 0
+    cancelled = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert admission.stats.waiting == 0
+    queued = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    assert admission.stats.waiting == 1
+    admission.release()
+    assert await queued
+    admission.release()
+    assert admission.stats.as_dict()["in_flight"] == 0
+
+    token = pool_pressure.started()
+    pool_pressure._waiting[token] -= 1
+    try:
+        assert not await admission.acquire()
+    finally:
+        pool_pressure.finished(token)
+    assert pool_pressure.wait == 0.0
+    stats = admission.stats.as_dict()
+    assert (stats["rejected"], stats["timed_out"], stats["shed"]) == (1, 1, 1)
+
+@pytest.mark.asyncio
+async def test_write_storm_leaves_reads_and_health_checks(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post, monkeypatch):
+    monkeypatch.setattr(write_admission, "limit", 0)
+    monkeypatch.setattr(write_admission, "max_queue", 0)
+
+    response = await async_client.post(f"/posts?author_uuid={test_user}", json={"title": "t", "content": "c"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.admission_retry_after)
+    assert (await async_client.get(f"/posts/{test_post}")).status_code == 200
+    assert (await async_client.get("http://test/")).status_code == 200
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_first_response(async_client: AsyncClient, async_session: AsyncSession, test_user):
+    path = f"/posts?author_uuid={test_user}"
+    headers = {"Idempotency-Key": "retry-1"}
+    first = await async_client.post(path, json={"title": "t", "content": "c"}, headers=headers)
+    replay = await async_client.post(path, json={"title": "t", "content": "c"}, headers=headers)
+    assert first.status_code == replay.status_code == 201
+    assert replay.json() == first.json()
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+    mismatch = await async_client.post(path, json={"title": "other", "content": "c"}, headers=headers)
+    assert mismatch.status_code == 422
+    # A new key is a new request.
+    other = await async_client.post(path, json={"title": "t", "content": "c"}, headers={"Idempotency-Key": "retry-2"})
+    assert other.json()["uuid"] != first.json()["uuid"]
+    count = (await async_session.exec(select(func.count()).select_from(Post).where(Post.author_uuid == test_user))).scalar_one()
+    assert count == 2
+
+@pytest.mark.asyncio
+async def test_idempotency_key_concurrent_duplicates_wait_for_original(async_client: AsyncClient, async_session: AsyncSession, test_user, test_post):
+    # A second app instance stands in for another worker process sharing the table.
+    other_worker = AsyncClient(app=create_app(), base_url=f"http://{settings.api_v1_prefix}/blog")
+    path = f"/comments?author_uuid={test_user}"
+    body = {"content": "once", "post_uuid": str(test_post)}
+    headers = {"Idempotency-Key": "comment-1"}
+    async with other_worker:
+        responses = await asyncio.gather(
+            *(client.post(path, json=body, headers=headers) for client in [async_client, other_worker] * 4)
+        )
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["uuid"] for response in responses}) == 1
+    assert sum("idempotent-replayed" in response.headers for response in responses) == 7
+    post = (await async_session.exec(select(Post).where(Post.uuid == test_post))).scalar_one()
+    assert post.comment_count == 1
+
+def test_idempotency_store_must_implement_every_operation():
+    class ClaimOnly(IdempotencyStore):
+        async def claim(self, key, fingerprint, lock_timeout):
+            return None
+
+    with pytest.raises(TypeError):
+        ClaimOnly()
+    assert isinstance(MemoryIdempotencyStore(max_size=1), IdempotencyStore)
+
+@pytest.mark.asyncio
+async def test_compression_negotiates_encoding_and_skips_small_bodies(async_session: AsyncSession, test_user, test_post, monkeypatch):
+    preferred = available_encodings()[0]
+    assert negotiate("gzip, deflate, zstd", available_encodings()) == preferred
+    assert negotiate("zstd;q=0.5, gzip", ["zstd", "gzip"]) == "gzip"
+    assert negotiate("zstd;q=0, *", ["zstd", "gzip"]) == "gzip"
+    assert negotiate("identity, *;q=0", ["zstd", "gzip"]) is None
+
+    monkeypatch.setattr(settings, "compression_min_size", 200)
+    async with AsyncClient(app=create_app(), base_url=f"http://{settings.api_v1_prefix}/blog") as client:
+        small = await client.get(f"/users/{test_user}", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+        assert small.headers["vary"] == "Accept-Encoding"
+
+        post = await client.get(f"/posts/{test_post}", headers={"Accept-Encoding": "gzip"})
+        assert post.headers["content-encoding"] == "gzip"
+        assert int(post.headers["content-length"]) < len(post.content)
+        assert post.json()["uuid"] == str(test_post)
+        # The weakened ETag still validates.
+        assert post.headers["etag"].startswith('W/"')
+        cached = await client.get(f"/posts/{test_post}", headers={"If-None-Match": post.headers["etag"]})
+        assert cached.status_code == 304
+
+        plain = await client.get(f"/posts/{test_post}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers and plain.json() == post.json()
+
+@pytest.mark.asyncio
+async def test_compression_streams_chunk_by_chunk():
+    chunks = [orjson.dumps({"line": i, "text": "x" * 300}) + b"\n" for i in range(5)]
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    for encoding in available_encodings():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", encoding.encode())]}
+        await CompressionMiddleware(streaming_app, min_size=500)(scope, None, send)
+        start, *bodies = sent
+        assert (b"content-encoding", encoding.encode()) in start["headers"]
+        assert not any(name == b"content-length" for name, _ in start["headers"])
+        # Held back only until the threshold, then one compressed message per chunk.
+        assert len(bodies) == len(chunks)
+        if encoding == "gzip":
+            decoder = zlib.decompressobj(31)
+            assert decoder.decompress(bodies[0]["body"]) == b"".join(chunks[:2])
+            assert decoder.decompress(b"".join(body["body"] for body in bodies[1:])) == b"".join(chunks[2:])
+        else:
+            assert zstandard.ZstdDecompressor().decompressobj().decompress(b"".join(body["body"] for body in bodies)) == b"".join(chunks)
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client: AsyncClient, async_session: AsyncSession, test_post):
+    await async_client.get(f"/posts/{test_post}")
+    await async_client.get(f"/posts/{uuid4()}")
+
+    response = await async_client.get("http://test/metrics")
+    assert response.status_code == 200
+    body = response.text
+    route = f'route="{settings.api_v1_prefix}/blog/posts/{{post_uuid}}"'
+    assert f'http_request_duration_seconds_count{{method="GET",{route},status="200"}}' in body
+    assert f'http_request_duration_seconds_count{{method="GET",{route},status="404"}}' in body
+    assert "db_pool_checked_out" in body
+    assert "db_pool_checkout_wait_seconds_count" in body
+    assert "read_coalescing_flights_total" in body
+    assert str(test_post) not in body
+
+@pytest.mark.asyncio
+async def test_server_timing_reports_request_queries(async_client: AsyncClient, async_session: AsyncSession, test_post):
+    response = await async_client.get(f"/posts/{test_post}", params={"expand": "author,comments"})
+    assert response.status_code == 200
+    db, app_timing = response.headers["server-timing"].split(", ")
+    assert db.startswith("db;dur=") and db.endswith(';desc="3 queries"')
+    assert app_timing.startswith("app;dur=")
+
+def test_query_stats_flags_repeated_statements():
+    stats = QueryStats(repeat_limit=2)
+    stats.started("SELECT 1")
+    stats.started("SELECT 1")
+    stats.started("SELECT 2")
+    with pytest.raises(RepeatedQueryError):
+        stats.started("SELECT 1")
+    assert stats.count == 4
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_pool_before_ready(async_session: AsyncSession):
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/ready")).status_code == 503
+        await async_engine.dispose()
+
+        async with app.router.lifespan_context(app):
+            response = await client.get("/ready")
+            assert response.status_code == 200 and response.json() == {"ready": True}
+            assert async_engine.pool.checkedin() == min(settings.db_pool_warmup, settings.db_pool_size)
+
+        assert (await client.get("/ready")).status_code == 503
+
+@pytest.mark.asyncio
+async def test_uuid7_keys_are_time_ordered(async_session: AsyncSession, test_user):
+    ids = [uuid7() for _ in range(1000)]
+    assert ids == sorted(ids)
+    assert {uuid.version for uuid in ids} == {7}
+
+    result = await async_session.exec(select(func.uuid_generate_v7()))
+    assert result.scalar_one().version == 7
+    assert test_user.version == 7
@@ -6,12 +6,11 @@ from typing import Generator
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
-from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import settings
-from app.core.db import async_engine
+from app.core.db import async_engine, async_session_factory
 from app.main import app
 
 @pytest.fixture(scope="session")
@@ -30,11 +29,7 @@ async def async_client():
 
 @pytest_asyncio.fixture(scope="function")
 async def async_session() -> AsyncSession: # type: ignore
-    session = sessionmaker(
-        async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-
-    async with session() as s:
+    async with async_session_factory() as s:
         async with async_engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.create_all)
 
@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+from typing import Deque, Dict
+
+import orjson
+
+from app import settings
+
+# Never queued or shed: health checks have to answer while under load.
+EXEMPT_PATHS = frozenset({"/", "/ready", "/metrics"})
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class PoolPressure:
+    """How long the DB pool is currently making checkouts wait: the age of
+    the oldest checkout still waiting, 0 when nobody is. Unlike an average
+    of past waits it drops back as soon as the pool catches up."""
+
+    def __init__(self):
+        self._waiting: Dict[object, float] = {}
+
+    def started(self) -> object:
+        token = object()
+        self._waiting[token] = perf_counter()
+        return token
+
+    def finished(self, token: object):
+        self._waiting.pop(token, None)
+
+    @property
+    def wait(self) -> float:
+        if not self._waiting:
+            return 0.0
+        return perf_counter() - min(self._waiting.values())
+
+
+pool_pressure = PoolPressure()
+
+
+class AdmissionStats:
+    def __init__(self):
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.shed = 0
+        self.in_flight = 0
+        self.waiting = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+
+class AdmissionClass:
+    """Caps the requests of one class (reads or writes) served at once.
+
+    Up to `limit` run; up to `max_queue` more wait in FIFO order for at most
+    `queue_timeout` seconds. Anything beyond that, and everything while the
+    pool checkout wait is above `max_pool_wait`, is turned away.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float, max_pool_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_pool_wait = max_pool_wait
+        self.stats = AdmissionStats()
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        if pool_pressure.wait > self.max_pool_wait:
+            self.stats.shed += 1
+            return False
+        if self._in_flight < self.limit:
+            self._admit()
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.stats.rejected += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.stats.queued += 1
+        self.stats.waiting = len(self._waiters)
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away; hand on a slot we may have been given.
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._abandon(future)
+            raise
+        if not future.done():
+            self._abandon(future)
+            self.stats.timed_out += 1
+            return False
+        # release() handed its slot straight to us; in_flight is unchanged.
+        self.stats.admitted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            self.stats.waiting = len(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+        self.stats.in_flight = self._in_flight
+
+    def _abandon(self, future: asyncio.Future):
+        # Drop a waiter that gave up so it doesn't hold a place in the queue.
+        future.cancel()
+        if future in self._waiters:
+            self._waiters.remove(future)
+        self.stats.waiting = len(self._waiters)
+
+    def _admit(self):
+        self._in_flight += 1
+        self.stats.in_flight = self._in_flight
+        self.stats.admitted += 1
+
+
+# Writes are capped well below the pool size and shed first, so reads (and
+# the exempt health checks) keep being served through a write storm.
+read_admission = AdmissionClass(
+    "read", settings.admission_read_limit, settings.admission_read_queue,
+    settings.admission_queue_timeout, settings.admission_read_max_pool_wait
+)
+write_admission = AdmissionClass(
+    "write", settings.admission_write_limit, settings.admission_write_queue,
+    settings.admission_queue_timeout, settings.admission_write_max_pool_wait
+)
+
+BUSY_BODY = orjson.dumps({"detail": "Server is busy, try again shortly"})
+
+
+class AdmissionMiddleware:
+    """Admission control in front of the routes: requests over their class's
+    limits get a 503 with Retry-After before they touch the database."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        admission = read_admission if scope["method"] in READ_METHODS else write_admission
+        if not await admission.acquire():
+            return await self._busy(send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+    @staticmethod
+    async def _busy(send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(BUSY_BODY)).encode("latin-1")),
+                (b"retry-after", str(settings.admission_retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": BUSY_BODY})
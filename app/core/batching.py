@@ -0,0 +1,134 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+
+class WriteBatcherBusy(Exception):
+    pass
+
+
+class WriteBatcherStats:
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.retried = 0
+        self.batch_size_max = 0
+        self.queued = 0
+
+    def observe_batch(self, size: int):
+        self.batches += 1
+        self.rows += size
+        self.batch_size_max = max(self.batch_size_max, size)
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "batch_size_max": self.batch_size_max,
+            "queued": self.queued,
+        }
+
+
+class WriteBatcher:
+    """Group commit: queues single-row writes and hands them to `flush` in
+    batches, so many concurrent callers share one statement and one commit.
+
+    A batch is flushed once `max_rows` writes are waiting or `max_delay`
+    seconds after the first one arrived, whichever comes first. `flush`
+    receives the queued items and returns one result per item, in order;
+    each caller gets its own result back. If a batch fails it is split in
+    half and each half retried, down to single items, so only the offending
+    caller sees the error and one bad row in n costs about 2*log2(n) extra
+    statements rather than n.
+
+    Once `max_queue` writes are waiting new ones are rejected with
+    `WriteBatcherBusy`. `stop()` stops accepting writes and drains the queue.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list], Awaitable[list]],
+        max_rows: int,
+        max_delay: float,
+        max_queue: int
+    ):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.running = False
+        self.stats = WriteBatcherStats()
+        self._pending: Deque[Tuple[object, asyncio.Future]] = deque()
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self.running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self.running = False
+            self._ready.set()
+            self._full.set()
+            await self._task
+            self._task = None
+
+    async def submit(self, item):
+        if not self.running:
+            raise RuntimeError("WriteBatcher is not running")
+        if len(self._pending) >= self.max_queue:
+            self.stats.rejected += 1
+            raise WriteBatcherBusy("Write queue is full")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self.stats.queued = len(self._pending)
+        self._ready.set()
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while self.running or self._pending:
+            if not self._pending:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self.running and len(self._pending) < self.max_rows:
+                # Give concurrent callers up to max_delay to join this batch.
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._pending.popleft() for _ in range(min(self.max_rows, len(self._pending)))]
+            self.stats.queued = len(self._pending)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[object, asyncio.Future]]):
+        # Callers that gave up before the flush don't get written at all.
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            results = await self.flush([item for item, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                _, future = batch[0]
+                if not future.done():
+                    future.set_exception(exc)
+                return
+            self.stats.retried += len(batch)
+            middle = len(batch) // 2
+            await self._flush(batch[:middle])
+            await self._flush(batch[middle:])
+            return
+        self.stats.observe_batch(len(batch))
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,279 @@
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app import settings
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class CacheBackend(ABC):
+    """Stores JSON-compatible values by key. Subclasses own expiry and eviction."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def get_versioned(self, key: str) -> Tuple[Optional[Any], Optional[int]]:
+        """The value plus a version to hand back to `set` after a miss.
+
+        Only backends shared between processes need one: in-process races
+        are already caught by ReadThroughCache.
+        """
+        return await self.get(key), None
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, version: Optional[int] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str) -> Optional[Any]:
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, version: Optional[int] = None):
+        pass
+
+    async def delete(self, *keys: str):
+        pass
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU bounded by entry count, with a TTL per entry."""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, version: Optional[int] = None):
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class LocalKeyValueStore:
+    """In-process stand-in for a shared key-value server such as Redis.
+
+    Implements the small subset of the `redis.asyncio.Redis` API that
+    `SharedCache` relies on.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def mget(self, *keys: str) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, px: Optional[int] = None):
+        expires_at = monotonic() + px / 1000 if px is not None else None
+        self._data[key] = (expires_at, value)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        expires_at = self._data[key][0] if key in self._data else None
+        self._data[key] = (expires_at, str(value).encode())
+        return value
+
+    async def pexpire(self, key: str, px: int) -> bool:
+        if await self.get(key) is None:
+            return False
+        self._data[key] = (monotonic() + px / 1000, self._data[key][1])
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class SharedCache(CacheBackend):
+    """Cache kept in a key-value server shared by every worker.
+
+    Every key has a generation counter that `delete` bumps. Values are
+    stored with the generation their load started under and only served
+    while it is still current, so a worker whose load raced with another
+    worker's invalidation can write the old value back but nobody will
+    read it. Generations outlive the values written under them by
+    `ttl` plus a minute.
+
+    Eviction is left to the server (e.g. Redis `maxmemory-policy allkeys-lru`),
+    so evictions are not counted here.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "blog:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        value, _ = await self.get_versioned(key)
+        return value
+
+    async def get_versioned(self, key: str) -> Tuple[Optional[Any], Optional[int]]:
+        raw, generation = await self.client.mget(self.prefix + key, self._generation_key(key))
+        generation = int(generation or 0)
+        entry = json.loads(raw) if raw is not None else None
+        # Entries written before generations existed are plain values: a miss.
+        if isinstance(entry, list) and len(entry) == 2 and entry[0] == generation:
+            self.stats.hits += 1
+            return entry[1], generation
+        self.stats.misses += 1
+        return None, generation
+
+    async def set(self, key: str, value: Any, version: Optional[int] = None):
+        if version is None:
+            _, version = await self.get_versioned(key)
+        raw = json.dumps([version, value], separators=(",", ":")).encode("utf-8")
+        await self.client.set(self.prefix + key, raw, px=int(self.ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        for key in keys:
+            generation_key = self._generation_key(key)
+            await self.client.incr(generation_key)
+            await self.client.pexpire(generation_key, int((2 * self.ttl + 60) * 1000))
+        await self.client.delete(*(self.prefix + key for key in keys))
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self.prefix}gen:{key}"
+
+
+class _PendingLoad:
+    __slots__ = ("stale",)
+
+    def __init__(self):
+        self.stale = False
+
+
+class ReadThroughCache:
+    """Read-through cache of SQLModel objects, stored as JSON-mode dumps.
+
+    A load that races with `invalidate` for the same key is marked stale;
+    its result is still returned to the caller but never stored, so a
+    reader can't put back a value that a completed write has replaced.
+    Races with invalidations in other processes are caught by the shared
+    backend's generations instead.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.enabled = not isinstance(backend, NullCache)
+        self._loading: Dict[str, List[_PendingLoad]] = {}
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
+
+    async def get_or_load(self, key: str, model, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        if not self.enabled:
+            return await loader()
+
+        value, version = await self.backend.get_versioned(key)
+        if value is not None:
+            return model.model_validate(value)
+
+        pending = _PendingLoad()
+        self._loading.setdefault(key, []).append(pending)
+        try:
+            obj = await loader()
+        finally:
+            loads = self._loading[key]
+            loads.remove(pending)
+            if not loads:
+                del self._loading[key]
+
+        if obj is not None and not pending.stale:
+            await self.backend.set(key, obj.model_dump(mode="json"), version=version)
+        return obj
+
+    async def invalidate(self, *keys: str):
+        if not self.enabled or not keys:
+            return
+        for key in keys:
+            for pending in self._loading.get(key, ()):
+                pending.stale = True
+        self.stats.invalidations += len(keys)
+        await self.backend.delete(*keys)
+
+
+def build_cache_backend() -> CacheBackend:
+    if settings.cache_backend == "memory":
+        return LRUCache(max_size=settings.cache_max_size, ttl=settings.cache_ttl)
+    if settings.cache_backend == "shared":
+        if settings.cache_url:
+            try:
+                from redis.asyncio import Redis
+            except ImportError:
+                raise RuntimeError(
+                    "CACHE_URL needs the redis package; install the app with the 'redis' extra"
+                ) from None
+            client = Redis.from_url(settings.cache_url)
+        else:
+            client = LocalKeyValueStore()
+        return SharedCache(client=client, ttl=settings.cache_ttl)
+    return NullCache()
+
+
+object_cache = ReadThroughCache(build_cache_backend())
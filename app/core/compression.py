@@ -0,0 +1,210 @@
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from app import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is offered only when the package is installed
+    zstandard = None
+
+COMPRESSIBLE_TYPES = frozenset({"application/json", "application/x-ndjson", "application/javascript"})
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # A sync flush per chunk lets the client decode what it has so far.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+def available_encodings() -> List[str]:
+    """Encodings the server can produce, most preferred first."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def make_encoder(encoding: str, level: Optional[int] = None):
+    if encoding == "zstd":
+        return ZstdEncoder(settings.compression_zstd_level if level is None else level)
+    return GzipEncoder(settings.compression_gzip_level if level is None else level)
+
+
+def negotiate(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header, or None for identity.
+
+    The client's q-values decide; the server's order breaks ties.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+class CompressionStats:
+    def __init__(self):
+        self.compressed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """Compresses text and JSON responses with zstd or gzip, whichever the
+    client prefers in Accept-Encoding.
+
+    Bodies smaller than `compression_min_size` go out unchanged. Streamed
+    responses are held back only until that many bytes have arrived; from
+    then on every chunk is compressed and flushed as it comes, so exports
+    are never buffered. ETags are weakened on compressed responses, which
+    the conditional request handling already accepts.
+    """
+
+    def __init__(self, app, min_size: Optional[int] = None):
+        self.app = app
+        self.min_size = settings.compression_min_size if min_size is None else min_size
+        self.available = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = negotiate(accept_encoding, self.available)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _CompressingSender(send, encoding, self.min_size))
+
+
+class _CompressingSender:
+    def __init__(self, send, encoding: str, min_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self._on_start(message)
+            if self.passthrough:
+                await self.send(self.start)
+            return
+        if message["type"] != "http.response.body":
+            return await self.send(message)
+        if self.passthrough:
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is not None:
+            return await self._send_compressed(body, more_body)
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if self.pending_size < self.min_size:
+            if more_body:
+                return
+            # Finished below the threshold: not worth compressing.
+            compression_stats.skipped += 1
+            self.passthrough = True
+            await self.send(self.start)
+            return await self.send({"type": "http.response.body", "body": b"".join(self.pending)})
+
+        headers = [(name, value) for name, value in self.start["headers"] if name not in (b"content-length", b"etag")]
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        etag = self._header(b"etag")
+        if etag is not None:
+            headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+        self.encoder = make_encoder(self.encoding)
+        compression_stats.compressed += 1
+        data, self.pending = b"".join(self.pending), []
+        if not more_body:
+            # The whole body is here: send it with its length.
+            compressed = self.encoder.compress(data, final=True)
+            self._count(data, compressed)
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            await self.send({**self.start, "headers": headers})
+            return await self.send({"type": "http.response.body", "body": compressed})
+        await self.send({**self.start, "headers": headers})
+        await self._send_compressed(data, more_body)
+
+    def _on_start(self, message):
+        self.start = {**message, "headers": [(name.lower(), value) for name, value in message.get("headers", ())]}
+        status = message["status"]
+        content_length = self._header(b"content-length")
+        if (
+            status < 200 or status in (204, 304)
+            or self._header(b"content-encoding") is not None
+            or not is_compressible(self._header(b"content-type", b"").decode("latin-1"))
+        ):
+            self.passthrough = True
+        else:
+            # Caches must key compressible responses on Accept-Encoding.
+            self.start["headers"].append((b"vary", b"Accept-Encoding"))
+            if content_length is not None and int(content_length) < self.min_size:
+                compression_stats.skipped += 1
+                self.passthrough = True
+
+    async def _send_compressed(self, data: bytes, more_body: bool):
+        compressed = self.encoder.compress(data, final=not more_body)
+        self._count(data, compressed)
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _header(self, name: bytes, default: Optional[bytes] = None) -> Optional[bytes]:
+        for key, value in self.start["headers"]:
+            if key == name:
+                return value
+        return default
+
+    @staticmethod
+    def _count(data: bytes, compressed: bytes):
+        compression_stats.bytes_in += len(data)
+        compression_stats.bytes_out += len(compressed)
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import blake2b
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Request, Response
+from fastapi import status as http_status
+
+
+def make_etag(kind: str, uuid, updated_at: datetime) -> str:
+    digest = blake2b(f"{kind}:{UUID(str(uuid))}:{updated_at.isoformat()}".encode("utf-8"), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(request: Request, etag: str, updated_at: datetime) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110 13.2.2).
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag in tags
+
+    if_modified_since = _parse_http_date(request.headers.get("if-modified-since"))
+    if if_modified_since is None:
+        return False
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    # HTTP dates only have second precision.
+    return updated_at.replace(microsecond=0) <= if_modified_since
+
+
+def set_validators(response: Response, etag: str, updated_at: datetime):
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(updated_at)
+
+
+def not_modified_response(etag: str, updated_at: datetime) -> Response:
+    response = Response(status_code=http_status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, updated_at)
+    return response
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,3 +13,104 @@ class Settings(BaseSettings):
     # Database
     db_async_connection_str: str
     db_async_test_connection_str: str
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    db_pgbouncer: bool = False
+    # Connections opened (and primed with the hot statements) at startup
+    db_pool_warmup: int = 5
+    # Log every statement through SQLAlchemy; per-request counts and timings
+    # are always available in Server-Timing and the access log instead
+    db_echo: bool = False
+
+    # Object cache: "none", "memory" (per-process LRU) or "shared"
+    # (Redis at cache_url, or an in-process stand-in when it is unset)
+    cache_backend: str = "none"
+    cache_max_size: int = 10000
+    cache_ttl: float = 60.0
+    cache_url: Optional[str] = None
+
+    # Share one query between concurrent identical single-object reads
+    read_coalescing: bool = True
+
+    # Comments returned per post by ?expand=comments
+    expand_comments_limit: int = 20
+
+    # Serialize read responses straight from ORM rows with orjson, skipping
+    # response_model validation (the OpenAPI schema is unchanged)
+    fast_json_responses: bool = False
+
+    # Rows fetched per server-side cursor round trip by the NDJSON export
+    export_batch_size: int = 1000
+
+    # Batch writes
+    batch_max_items: int = 5000
+
+    # Group commit for POST /comments (opt-in): single inserts are queued and
+    # written as one multi-row INSERT per comment_batch_size rows or every
+    # comment_batch_delay seconds; new ones get a 503 once
+    # comment_batch_max_queue are waiting
+    comment_batching: bool = False
+    comment_batch_size: int = 500
+    comment_batch_delay: float = 0.002
+    comment_batch_max_queue: int = 10000
+
+    # Background purge of deleted users and tombstoned posts/comments: rows
+    # per transaction, pause between batches (throttling), how often to look
+    # for new work when idle and how long tombstones are kept (seconds)
+    purge_enabled: bool = True
+    purge_batch_size: int = 500
+    purge_pause: float = 0.05
+    purge_poll_interval: float = 5.0
+    purge_retention: float = 86400.0
+
+    # Admission control: requests served at once per class (reads are
+    # GET/HEAD, writes everything else), how many more may queue and for how
+    # long, and the pool checkout wait (seconds) past which a class is shed
+    # with a 503. Writes are capped below the pool size and shed first.
+    admission_enabled: bool = True
+    admission_read_limit: int = 64
+    admission_read_queue: int = 256
+    admission_read_max_pool_wait: float = 2.0
+    admission_write_limit: int = 8
+    admission_write_queue: int = 128
+    admission_write_max_pool_wait: float = 0.5
+    admission_queue_timeout: float = 2.0
+    admission_retry_after: int = 1
+
+    # Idempotency-Key on POST routes: "database" (idempotency_keys, shared by
+    # every worker), "memory" (per process, idempotency_max_size keys) or
+    # "none". Responses are replayed for idempotency_ttl seconds; a retry of
+    # a request still running waits up to idempotency_wait seconds for it,
+    # and a claim left behind by a crashed worker lapses after
+    # idempotency_lock_timeout
+    idempotency_backend: str = "database"
+    idempotency_ttl: float = 86400.0
+    idempotency_wait: float = 10.0
+    idempotency_poll_interval: float = 0.05
+    idempotency_lock_timeout: float = 60.0
+    idempotency_max_size: int = 10000
+
+    # Response compression: zstd (when the zstandard package is installed)
+    # or gzip, as negotiated from Accept-Encoding; bodies under
+    # compression_min_size bytes are sent as they are
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_zstd_level: int = 3
+
+    # Prometheus metrics at /metrics
+    metrics_enabled: bool = True
+    metrics_loop_lag_interval: float = 0.5
+
+    # Requests fail when one statement shape runs more than this many times
+    # (debug and tests only; catches N+1 loops)
+    query_repeat_limit: int = 10
+
+    # Password hashing
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
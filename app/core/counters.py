@@ -0,0 +1,200 @@
+from sqlalchemy import DDL, event
+
+# Denormalized counters (posts.comment_count, users.post_count and
+# users.comment_count) are kept exact by statement-level triggers, so every
+# write path is covered: BlogCRUD, batch inserts, the NDJSON import and
+# ON DELETE cascades. Transition tables turn a multi-row statement into one
+# UPDATE per parent table. The counters are part of the read models, so
+# updated_at is bumped as well to keep ETag/Last-Modified honest.
+#
+# Only live rows are counted. Setting a tombstone (deleted_at) takes the row
+# out of the counts, so purging it later changes nothing; a user's
+# comment_count also leaves out comments on tombstoned posts.
+COUNTER_FUNCTIONS = (
+    """
+    CREATE OR REPLACE FUNCTION blog_posts_counters() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE users u
+            SET post_count = u.post_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT author_uuid, count(*) AS n FROM new_rows
+                  WHERE deleted_at IS NULL GROUP BY author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE users u
+            SET post_count = u.post_count - d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT author_uuid, count(*) AS n FROM old_rows
+                  WHERE deleted_at IS NULL GROUP BY author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        ELSE
+            -- Most updates (the comment counter included) leave the
+            -- tombstone alone.
+            IF NOT EXISTS (
+                SELECT 1 FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+                WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+            ) THEN
+                RETURN NULL;
+            END IF;
+            UPDATE users u
+            SET post_count = u.post_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT p.author_uuid, sum(CASE WHEN p.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+                  FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+                  WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+                  GROUP BY p.author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+            UPDATE users u
+            SET comment_count = u.comment_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT c.author_uuid, sum(CASE WHEN p.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+                  FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+                  JOIN comments c ON c.post_uuid = p.uuid AND c.deleted_at IS NULL
+                  WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+                  GROUP BY c.author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION blog_comments_counters() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE posts p
+            SET comment_count = p.comment_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT post_uuid, count(*) AS n FROM new_rows
+                  WHERE deleted_at IS NULL GROUP BY post_uuid) d
+            WHERE p.uuid = d.post_uuid;
+            UPDATE users u
+            SET comment_count = u.comment_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT c.author_uuid, count(*) AS n
+                  FROM new_rows c JOIN posts p ON p.uuid = c.post_uuid
+                  WHERE c.deleted_at IS NULL AND p.deleted_at IS NULL
+                  GROUP BY c.author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE posts p
+            SET comment_count = p.comment_count - d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT post_uuid, count(*) AS n FROM old_rows
+                  WHERE deleted_at IS NULL GROUP BY post_uuid) d
+            WHERE p.uuid = d.post_uuid;
+            -- A post that is already gone was live when it was deleted (a
+            -- cascade); a tombstoned one took its comments out of the counts.
+            UPDATE users u
+            SET comment_count = u.comment_count - d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT c.author_uuid, count(*) AS n
+                  FROM old_rows c LEFT JOIN posts p ON p.uuid = c.post_uuid
+                  WHERE c.deleted_at IS NULL AND p.deleted_at IS NULL
+                  GROUP BY c.author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        ELSE
+            IF NOT EXISTS (
+                SELECT 1 FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+                WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+            ) THEN
+                RETURN NULL;
+            END IF;
+            UPDATE posts p
+            SET comment_count = p.comment_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT c.post_uuid, sum(CASE WHEN c.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+                  FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+                  WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+                  GROUP BY c.post_uuid) d
+            WHERE p.uuid = d.post_uuid;
+            UPDATE users u
+            SET comment_count = u.comment_count + d.n,
+                updated_at = timezone('utc', clock_timestamp())
+            FROM (SELECT c.author_uuid, sum(CASE WHEN c.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+                  FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+                  JOIN posts p ON p.uuid = c.post_uuid AND p.deleted_at IS NULL
+                  WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+                  GROUP BY c.author_uuid) d
+            WHERE u.uuid = d.author_uuid;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+)
+
+COUNTER_TRIGGERS = {
+    "posts": (
+        """
+        CREATE TRIGGER posts_counters_insert AFTER INSERT ON posts
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_posts_counters()
+        """,
+        """
+        CREATE TRIGGER posts_counters_delete AFTER DELETE ON posts
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_posts_counters()
+        """,
+        """
+        CREATE TRIGGER posts_counters_update AFTER UPDATE ON posts
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_posts_counters()
+        """,
+    ),
+    "comments": (
+        """
+        CREATE TRIGGER comments_counters_insert AFTER INSERT ON comments
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_comments_counters()
+        """,
+        """
+        CREATE TRIGGER comments_counters_delete AFTER DELETE ON comments
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_comments_counters()
+        """,
+        """
+        CREATE TRIGGER comments_counters_update AFTER UPDATE ON comments
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION blog_comments_counters()
+        """,
+    ),
+}
+
+# Recomputes every counter from scratch; only rows that drifted are written.
+RECOUNT_SQL = (
+    """
+    UPDATE posts p
+    SET comment_count = coalesce(c.n, 0)
+    FROM posts p2
+    LEFT JOIN (SELECT post_uuid, count(*) AS n FROM comments
+               WHERE deleted_at IS NULL GROUP BY post_uuid) c
+        ON c.post_uuid = p2.uuid
+    WHERE p.uuid = p2.uuid AND p.comment_count <> coalesce(c.n, 0)
+    """,
+    """
+    UPDATE users u
+    SET post_count = coalesce(p.n, 0), comment_count = coalesce(c.n, 0)
+    FROM users u2
+    LEFT JOIN (SELECT author_uuid, count(*) AS n FROM posts
+               WHERE deleted_at IS NULL GROUP BY author_uuid) p
+        ON p.author_uuid = u2.uuid
+    LEFT JOIN (SELECT c.author_uuid, count(*) AS n
+               FROM comments c JOIN posts p ON p.uuid = c.post_uuid
+               WHERE c.deleted_at IS NULL AND p.deleted_at IS NULL
+               GROUP BY c.author_uuid) c
+        ON c.author_uuid = u2.uuid
+    WHERE u.uuid = u2.uuid
+      AND (u.post_count <> coalesce(p.n, 0) OR u.comment_count <> coalesce(c.n, 0))
+    """,
+)
+
+
+def install_counter_triggers(metadata, tables: dict):
+    """Create the counter functions and triggers whenever create_all builds the tables."""
+    for statement in COUNTER_FUNCTIONS:
+        event.listen(metadata, "before_create", DDL(statement))
+    for name, statements in COUNTER_TRIGGERS.items():
+        for statement in statements:
+            event.listen(tables[name], "after_create", DDL(statement))
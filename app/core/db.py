@@ -1,24 +1,82 @@
+import asyncio
 from sys import modules
+from time import perf_counter
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import settings
+from app.core.admission import pool_pressure
+from app.core.metrics import pool_wait
+from app.core.querystats import instrument_engine
 
 db_connection_str = settings.db_async_connection_str
 if "pytest" in modules:
     db_connection_str = settings.db_async_test_connection_str
 
+connect_args = {
+    "statement_cache_size": settings.db_statement_cache_size,
+}
+if settings.db_pgbouncer:
+    # PgBouncer in transaction mode hands each transaction to an arbitrary
+    # server connection, so named prepared statements can't be reused.
+    connect_args = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = perf_counter()
+        token = pool_pressure.started()
+        try:
+            return super()._do_get()
+        finally:
+            pool_pressure.finished(token)
+            pool_wait.observe(perf_counter() - started)
+
 async_engine = create_async_engine(
     db_connection_str,
-    echo=True,
-    future=True
+    echo=settings.db_echo,
+    future=True,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=connect_args
+)
+
+instrument_engine(async_engine)
+
+async_session_factory = sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
 async def get_async_session() -> AsyncSession:
-    async_session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
+
+async def warm_pool(connections: int, prime: Optional[Callable[[AsyncConnection], Awaitable]] = None):
+    """Open `connections` pooled connections up front, optionally priming each.
+
+    They are all held at once so the pool really grows to that size instead
+    of one connection being handed back and reused.
+    """
+    connections = min(connections, settings.db_pool_size)
+    if connections <= 0:
+        return
+    opened = await asyncio.gather(*(async_engine.connect() for _ in range(connections)))
+    try:
+        if prime is not None:
+            await asyncio.gather(*(prime(conn) for conn in opened))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in opened))
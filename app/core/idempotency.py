@@ -0,0 +1,354 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import settings
+from app.core.db import async_engine
+from app.core.models import IdempotencyKey
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Per-request headers that must not be replayed.
+NOT_STORED = frozenset({b"server-timing", b"date"})
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class StoredResponse:
+    """A key's entry: the request fingerprint plus, once the original request
+    has finished, the response to replay (status_code is None until then)."""
+
+    def __init__(self, fingerprint: str, status_code: Optional[int] = None, headers: Headers = (), body: bytes = b""):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = list(headers)
+        self.body = body
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class IdempotencyStats:
+    def __init__(self):
+        self.claimed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.released = 0
+        self.conflicts = 0
+        self.mismatches = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "claimed": self.claimed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "released": self.released,
+            "conflicts": self.conflicts,
+            "mismatches": self.mismatches,
+        }
+
+
+class IdempotencyStore(ABC):
+    """Keeps one StoredResponse per key. `claim` atomically creates an
+    in-progress entry and returns None, or returns the entry already there.
+    In-progress entries lapse after `lock_timeout` seconds so a crashed
+    worker can't hold a key for the whole TTL."""
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str, lock_timeout: float) -> Optional[StoredResponse]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release(self, key: str):
+        raise NotImplementedError
+
+    async def purge_expired(self, batch_size: int) -> int:
+        return 0
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store, bounded by entry count."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    def _lookup(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            return None
+        return response
+
+    def _put(self, key: str, response: StoredResponse, ttl: float):
+        self._entries[key] = (monotonic() + ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def claim(self, key: str, fingerprint: str, lock_timeout: float) -> Optional[StoredResponse]:
+        existing = self._lookup(key)
+        if existing is not None:
+            return existing
+        self._put(key, StoredResponse(fingerprint), lock_timeout)
+        return None
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        return self._lookup(key)
+
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        self._put(key, response, ttl)
+
+    async def release(self, key: str):
+        self._entries.pop(key, None)
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """Shared by every worker through the idempotency_keys table; expired
+    rows are removed in batches by the purge worker."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def claim(self, key: str, fingerprint: str, lock_timeout: float) -> Optional[StoredResponse]:
+        while True:
+            now = datetime.utcnow()
+            statement = pg_insert(IdempotencyKey).values(
+                key=key, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=lock_timeout)
+            )
+            # An expired row is taken over as if it wasn't there.
+            statement = statement.on_conflict_do_update(
+                index_elements=[IdempotencyKey.key],
+                set_={
+                    "fingerprint": statement.excluded.fingerprint,
+                    "status_code": None,
+                    "headers": None,
+                    "body": None,
+                    "created_at": statement.excluded.created_at,
+                    "expires_at": statement.excluded.expires_at,
+                },
+                where=IdempotencyKey.expires_at <= now,
+            ).returning(IdempotencyKey.key)
+            async with self.engine.begin() as conn:
+                if (await conn.execute(statement)).first() is not None:
+                    return None
+                row = (await conn.execute(self._select(key))).first()
+            if row is not None:
+                return self._response(row)
+            # Released between the two statements; try to claim it again.
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(self._select(key).where(IdempotencyKey.expires_at > datetime.utcnow()))).first()
+        return None if row is None else self._response(row)
+
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        statement = IdempotencyKey.__table__.update().where(IdempotencyKey.key == key).values(
+            status_code=response.status_code,
+            headers=[[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers],
+            body=response.body,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(statement)
+
+    async def release(self, key: str):
+        statement = delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        async with self.engine.begin() as conn:
+            await conn.execute(statement)
+
+    async def purge_expired(self, batch_size: int) -> int:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired.scalar_subquery())))
+        return result.rowcount
+
+    @staticmethod
+    def _select(key: str):
+        return select(
+            IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.headers, IdempotencyKey.body
+        ).where(IdempotencyKey.key == key)
+
+    @staticmethod
+    def _response(row) -> StoredResponse:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in row.headers or ()]
+        return StoredResponse(row.fingerprint, row.status_code, headers, row.body or b"")
+
+
+def build_idempotency_store() -> Optional[IdempotencyStore]:
+    if settings.idempotency_backend == "memory":
+        return MemoryIdempotencyStore(max_size=settings.idempotency_max_size)
+    if settings.idempotency_backend == "database":
+        return DatabaseIdempotencyStore(async_engine)
+    return None
+
+
+idempotency_store = build_idempotency_store()
+idempotency_stats = IdempotencyStats()
+
+
+class IdempotencyMiddleware:
+    """Idempotency-Key support for POST requests.
+
+    The first response for a key (anything but a 5xx) is stored for
+    `idempotency_ttl` seconds and replayed, with `Idempotent-Replayed: true`,
+    for every retry carrying the same key and the same request; the route
+    doesn't run again. Reusing a key for a different request is a 422. A
+    retry that arrives while the original is still running waits for it
+    (in-process on the original's future, otherwise by polling the store)
+    and gets a 409 if it doesn't finish within `idempotency_wait`. A failed
+    original releases the key so the next retry runs normally.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = None):
+        self.app = app
+        self.store = store or idempotency_store
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        key = dict(scope["headers"]).get(HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await self._error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+        body, receive = await self._buffer(receive)
+        fingerprint = hashlib.sha256(
+            b"\0".join((scope["method"].encode(), scope["path"].encode(), scope["query_string"], body))
+        ).hexdigest()
+        key = key.decode("latin-1")
+        deadline = monotonic() + settings.idempotency_wait
+        while True:
+            if key in self._in_flight:
+                stored = await self._wait_local(key, deadline)
+            else:
+                stored = await self.store.claim(key, fingerprint, settings.idempotency_lock_timeout)
+                if stored is None:
+                    idempotency_stats.claimed += 1
+                    return await self._run(key, fingerprint, scope, receive, send)
+                if stored.fingerprint == fingerprint and not stored.completed:
+                    stored = await self._poll(key, deadline)
+            if stored is not None and stored.fingerprint != fingerprint:
+                idempotency_stats.mismatches += 1
+                return await self._error(send, 422, "Idempotency-Key was already used for a different request")
+            if stored is not None and stored.completed:
+                idempotency_stats.replayed += 1
+                return await self._replay(send, stored)
+            if monotonic() >= deadline:
+                idempotency_stats.conflicts += 1
+                return await self._error(send, 409, "A request with this Idempotency-Key is still in progress")
+            # The original failed and released the key: run this one instead.
+
+    async def _run(self, key: str, fingerprint: str, scope, receive, send):
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        status_code, headers, chunks = None, [], []
+
+        async def capture(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(name, value) for name, value in message.get("headers", ()) if name.lower() not in NOT_STORED]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, receive, capture)
+            if status_code is not None and status_code < 500:
+                response = StoredResponse(fingerprint, status_code, headers, b"".join(chunks))
+                await self.store.complete(key, response, settings.idempotency_ttl)
+                stored = response
+        finally:
+            if stored is None:
+                idempotency_stats.released += 1
+                # Shielded so a cancelled request still frees its key.
+                await asyncio.shield(self.store.release(key))
+            del self._in_flight[key]
+            future.set_result(stored)
+
+    async def _wait_local(self, key: str, deadline: float) -> Optional[StoredResponse]:
+        idempotency_stats.waited += 1
+        future = self._in_flight[key]
+        done, _ = await asyncio.wait((future,), timeout=max(deadline - monotonic(), 0))
+        return future.result() if done else None
+
+    async def _poll(self, key: str, deadline: float) -> Optional[StoredResponse]:
+        # The original is running in another process.
+        idempotency_stats.waited += 1
+        while monotonic() < deadline:
+            await asyncio.sleep(settings.idempotency_poll_interval)
+            stored = await self.store.get(key)
+            if stored is None or stored.completed:
+                return stored
+        return None
+
+    @staticmethod
+    async def _buffer(receive):
+        # The body is needed for the fingerprint; the route gets it replayed.
+        messages, chunks = [], []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return b"".join(chunks), replay
+
+    @staticmethod
+    async def _replay(send, stored: StoredResponse):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status_code,
+            "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
+
+    @staticmethod
+    async def _error(send, status_code: int, detail: str):
+        body = orjson.dumps({"detail": detail})
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
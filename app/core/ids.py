@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+from uuid import UUID
+
+from sqlalchemy import DDL, event
+
+# Server-side UUIDv7 for Postgres versions without a built-in uuidv7(): the
+# first 48 bits of a random v4 are overwritten with the unix time in ms and
+# the version nibble is flipped from 4 to 7 (bits 52 and 53).
+UUID7_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE
+"""
+
+
+_lock = threading.Lock()
+_last = 0
+
+
+def uuid7() -> UUID:
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    48 bits of unix time in ms, then 12 bits of sub-millisecond time, then
+    62 random bits. Ids minted by one process are strictly increasing, even
+    when the clock is coarse or steps backwards.
+    """
+    global _last
+    nanoseconds = time.time_ns()
+    milliseconds, remainder = divmod(nanoseconds, 1_000_000)
+    sub_ms = remainder * 4096 // 1_000_000
+    rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (milliseconds & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76
+    value |= sub_ms << 64
+    value |= 0b10 << 62
+    value |= rand
+    with _lock:
+        if value <= _last:
+            value = _last + 1
+        _last = value
+    return UUID(int=value)
+
+
+def install_uuid7_function(metadata):
+    """Create uuid_generate_v7() before create_all builds the tables that default to it."""
+    event.listen(metadata, "before_create", DDL(UUID7_FUNCTION))
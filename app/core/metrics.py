@@ -0,0 +1,164 @@
+import asyncio
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app import settings
+
+# Everything is registered on our own registry rather than the global one, so
+# importing the app twice (tests, reloads) never trips duplicate registration.
+registry = CollectorRegistry(auto_describe=True)
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ("method", "route", "status"), registry=registry
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Response body size by route",
+    ("method", "route"), registry=registry,
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served", registry=registry)
+pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", registry=registry,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+loop_lag = Gauge("event_loop_lag_seconds", "Delay of the last event-loop heartbeat", registry=registry)
+loop_lag_max = Gauge("event_loop_lag_max_seconds", "Largest event-loop heartbeat delay seen", registry=registry)
+startup_seconds = Gauge("app_startup_seconds", "Time spent in each startup phase", ("phase",), registry=registry)
+
+_registered = set()
+
+
+def register_collector(name: str, collector):
+    # create_app() may run more than once per process (tests, reloads).
+    if name not in _registered:
+        registry.register(collector)
+        _registered.add(name)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, size and in-flight requests.
+
+    The route label is the matched path template (e.g. /api/v1/blog/posts/{post_uuid}),
+    never the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, int], tuple] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            requests_in_flight.dec()
+            duration, sizes = self._metrics(scope, status)
+            duration.observe(elapsed)
+            sizes.observe(size)
+
+    def _metrics(self, scope, status: int) -> tuple:
+        route = scope.get("route")
+        path = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+        key = (scope["method"], path, status)
+        # labels() does a lock and dict lookup per call; cache the children.
+        children = self._children.get(key)
+        if children is None:
+            children = (
+                request_duration.labels(scope["method"], path, str(status)),
+                response_size.labels(scope["method"], path),
+            )
+            self._children[key] = children
+        return children
+
+
+class PoolCollector:
+    """Reads checked-out/overflow/size gauges from the engine's pool at scrape time."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self) -> Iterable:
+        # engine.pool is replaced by dispose(), so look it up on every scrape.
+        pool = self.engine.pool
+        for name, doc, read in (
+            ("db_pool_size", "Configured pool size", pool.size),
+            ("db_pool_checked_out", "Connections currently checked out", pool.checkedout),
+            ("db_pool_checked_in", "Idle connections in the pool", pool.checkedin),
+            ("db_pool_overflow", "Connections open beyond pool_size", pool.overflow),
+        ):
+            yield GaugeMetricFamily(name, doc, value=read())
+
+
+class StatsCollector:
+    """Exports a component's `stats.as_dict()` (cache, single-flight, hasher)."""
+
+    def __init__(self, name: str, read: Callable[[], dict], gauges: Iterable[str] = ()):
+        self.name = name
+        self.read = read
+        self.gauges = set(gauges)
+
+    def collect(self) -> Iterable:
+        for key, value in self.read().items():
+            metric = f"{self.name}_{key}"
+            if key in self.gauges:
+                yield GaugeMetricFamily(metric, f"{self.name} {key}", value=value)
+            else:
+                yield CounterMetricFamily(metric, f"{self.name} {key}", value=value)
+
+
+class LoopLagMonitor:
+    """Heartbeat task that should wake every `interval`; any extra delay is
+    time the loop spent blocked on something else."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, perf_counter() - started - self.interval)
+            loop_lag.set(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+                loop_lag_max.set(lag)
+
+
+loop_lag_monitor = LoopLagMonitor(settings.metrics_loop_lag_interval)
@@ -1,9 +1,14 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import text, ForeignKey
+from sqlalchemy import exists, select, text, Column, Computed, ForeignKey, Index
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlmodel.sql.sqltypes import GUID
+from app.core.counters import install_counter_triggers
+from app.core.ids import install_uuid7_function, uuid7
 from datetime import datetime
 from pydantic import BaseModel
-from uuid import UUID, uuid4
-from typing import List
+from uuid import UUID
+from typing import List, Optional
 
 class HealthCheck(BaseModel):
     name: str
@@ -15,13 +20,11 @@ class StatusMessage(BaseModel):
     message: str
 
 class UUIDModel(SQLModel):
-    uuid: UUID = Field(default_factory=uuid4,
+    uuid: UUID = Field(default_factory=uuid7,
                        primary_key=True,
-                       index=True,
                        nullable=False,
                        sa_column_kwargs={
-                           "server_default": text("gen_random_uuid()"),
-                           "unique": True
+                           "server_default": text("uuid_generate_v7()")
                        })
 
 class TimestampModel(SQLModel):
@@ -37,41 +40,142 @@ class TimestampModel(SQLModel):
                                               "onupdate": text("current_timestamp(0)")
                                           })
 
+# Partial index predicates for tombstoned (soft-deleted) tables.
+LIVE = text("deleted_at IS NULL")
+TOMBSTONED = text("deleted_at IS NOT NULL")
+
 class User(SQLModel, table=True):
     __tablename__ = 'users'
-    uuid: UUID = Field(default_factory=uuid4, primary_key=True, index=True, nullable=False,
-                       sa_column_kwargs={"server_default": text("gen_random_uuid()"), "unique": True})
+    # Deleted accounts are few; readers anti-join against this to hide
+    # their content until the purge worker removes it.
+    __table_args__ = (
+        Index("ix_users_deleted_at", "deleted_at", postgresql_where=TOMBSTONED),
+    )
+    # The primary key is the only index on uuid; v7 keys keep inserts at the
+    # right-hand edge of it.
+    uuid: UUID = Field(default_factory=uuid7, primary_key=True, nullable=False,
+                       sa_column_kwargs={"server_default": text("uuid_generate_v7()")})
     username: str = Field(index=True, nullable=False, max_length=255)
     email: str = Field(index=True, nullable=False, max_length=255)
     hashed_password: str = Field(nullable=False)
+    # Maintained by the triggers in app.core.counters
+    post_count: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": text("0")})
+    comment_count: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": text("0")})
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False,
+                                 sa_column_kwargs={"server_default": text("timezone('utc', now())"),
+                                                   "onupdate": datetime.utcnow})
+    # Set by delete_user; the account is gone for readers from then on and the
+    # purge worker removes its content (see UserDeletion).
+    deleted_at: Optional[datetime] = Field(default=None, nullable=True)
     # Relationships
     posts: List["Post"] = Relationship(back_populates="author", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
     comments: List["Comment"] = Relationship(back_populates="author", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
+
+POST_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
 class Post(SQLModel, table=True):
     __tablename__ = 'posts'
-    uuid: UUID = Field(default_factory=uuid4, primary_key=True, index=True, nullable=False,
-                       sa_column_kwargs={"server_default": text("gen_random_uuid()"), "unique": True})
+    __table_args__ = (
+        # Full-text search vector, maintained by Postgres. It is left unmapped
+        # so it never rides along in ORM loads, RETURNING or the object cache.
+        Column("search_vector", TSVECTOR, Computed(POST_SEARCH_VECTOR, persisted=True)),
+        # Listing and search only ever look at live rows. The author index
+        # stays complete because the users foreign key cascades through it.
+        Index("ix_posts_created_at_uuid", "created_at", "uuid", postgresql_where=LIVE),
+        Index("ix_posts_author_uuid_created_at_uuid", "author_uuid", "created_at", "uuid"),
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin", postgresql_where=LIVE),
+        Index("ix_posts_deleted_at", "deleted_at", postgresql_where=TOMBSTONED),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+    uuid: UUID = Field(default_factory=uuid7, primary_key=True, nullable=False,
+                       sa_column_kwargs={"server_default": text("uuid_generate_v7()")})
     title: str = Field(nullable=False)
     content: str = Field(nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    author_uuid: UUID = Field(foreign_key="users.uuid", sa_column_kwargs={
-        "foreign_key": ForeignKey("users.uuid", ondelete="CASCADE")
-    })
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False,
+                                 sa_column_kwargs={"server_default": text("timezone('utc', now())"),
+                                                   "onupdate": datetime.utcnow})
+    author_uuid: UUID = Field(sa_column=Column(GUID(), ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False))
+    # Tombstone set by delete_post; the purge worker removes the row (and its
+    # comments) once purge_retention has passed.
+    deleted_at: Optional[datetime] = Field(default=None, nullable=True)
+    # Maintained by the triggers in app.core.counters
+    comment_count: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": text("0")})
     # Relationships
     author: User = Relationship(back_populates="posts")
     comments: List["Comment"] = Relationship(back_populates="post", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
 class Comment(SQLModel, table=True):
     __tablename__ = 'comments'
-    uuid: UUID = Field(default_factory=uuid4, primary_key=True, index=True, nullable=False,
-                       sa_column_kwargs={"server_default": text("gen_random_uuid()"), "unique": True})
+    __table_args__ = (
+        Index("ix_comments_post_uuid_created_at_uuid", "post_uuid", "created_at", "uuid"),
+        Index("ix_comments_created_at_uuid", "created_at", "uuid", postgresql_where=LIVE),
+        Index("ix_comments_author_uuid", "author_uuid"),
+        Index("ix_comments_deleted_at", "deleted_at", postgresql_where=TOMBSTONED),
+    )
+    uuid: UUID = Field(default_factory=uuid7, primary_key=True, nullable=False,
+                       sa_column_kwargs={"server_default": text("uuid_generate_v7()")})
     content: str = Field(nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    author_uuid: UUID = Field(foreign_key="users.uuid")
-    post_uuid: UUID = Field(foreign_key="posts.uuid", sa_column_kwargs={
-        "foreign_key": ForeignKey("posts.uuid", ondelete="CASCADE")
-    })
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False,
+                                 sa_column_kwargs={"server_default": text("timezone('utc', now())"),
+                                                   "onupdate": datetime.utcnow})
+    author_uuid: UUID = Field(sa_column=Column(GUID(), ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False))
+    post_uuid: UUID = Field(sa_column=Column(GUID(), ForeignKey("posts.uuid", ondelete="CASCADE"), nullable=False))
+    deleted_at: Optional[datetime] = Field(default=None, nullable=True)
     # Relationships
     author: User = Relationship(back_populates="comments")
     post: Post = Relationship(back_populates="comments")
+
+class UserDeletion(SQLModel, table=True):
+    __tablename__ = 'user_deletions'
+    # Progress of a background user purge. Rows outlive the user and are
+    # kept once finished as a record of what was removed.
+    __table_args__ = (
+        Index("ix_user_deletions_pending", "requested_at", postgresql_where=text("finished_at IS NULL")),
+    )
+    user_uuid: UUID = Field(primary_key=True, nullable=False)
+    requested_at: datetime = Field(default_factory=datetime.utcnow, nullable=False,
+                                   sa_column_kwargs={"server_default": text("timezone('utc', now())")})
+    comments_deleted: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": text("0")})
+    posts_deleted: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": text("0")})
+    finished_at: Optional[datetime] = Field(default=None, nullable=True)
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = 'idempotency_keys'
+    # Responses stored for Idempotency-Key replays (app.core.idempotency).
+    # status_code is NULL while the original request is still running.
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    key: str = Field(primary_key=True, max_length=255)
+    fingerprint: str = Field(nullable=False)
+    status_code: Optional[int] = Field(default=None, nullable=True)
+    headers: Optional[list] = Field(default=None, sa_column=Column(JSONB, nullable=True))
+    body: Optional[bytes] = Field(default=None, nullable=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(nullable=False)
+
+def live(model) -> tuple:
+    """WHERE conditions hiding tombstoned rows from readers.
+
+    Posts and comments by a deleted user, and comments on a hidden post,
+    are hidden with it until the purge worker gets to them.
+    """
+    conditions = ()
+    if "deleted_at" in model.__table__.c:
+        conditions += (model.deleted_at.is_(None),)
+    if model is Post or model is Comment:
+        # Aliased so it never correlates with a users table in the outer query.
+        deleted_author = aliased(User)
+        conditions += (~exists().where(deleted_author.uuid == model.author_uuid, deleted_author.deleted_at.is_not(None)),)
+    if model is Comment:
+        conditions += (Comment.post_uuid.in_(select(Post.uuid).where(*live(Post))),)
+    return conditions
+
+install_uuid7_function(SQLModel.metadata)
+install_counter_triggers(SQLModel.metadata, {"posts": Post.__table__, "comments": Comment.__table__})
@@ -0,0 +1,78 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi import status as http_status
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, uuid: UUID) -> str:
+    return _encode([created_at.isoformat(), str(uuid)])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    created_at, uuid = _decode(cursor)
+    try:
+        return datetime.fromisoformat(created_at), UUID(uuid)
+    except (TypeError, ValueError):
+        raise _invalid_cursor()
+
+
+def encode_rank_cursor(rank: float, uuid: UUID) -> str:
+    return _encode([rank, str(uuid)])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, UUID]:
+    rank, uuid = _decode(cursor)
+    try:
+        return float(rank), UUID(uuid)
+    except (TypeError, ValueError):
+        raise _invalid_cursor()
+
+
+def keyset_page(statement, model, limit: int, cursor: Optional[str] = None):
+    # Newest first over (created_at, uuid); the row comparison lets Postgres
+    # seek straight into the composite index however deep the page is.
+    if cursor is not None:
+        created_at, uuid = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.uuid) < tuple_(created_at, uuid)
+        )
+    return statement.order_by(model.created_at.desc(), model.uuid.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.uuid)
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+    except (BinasciiError, UnicodeError, ValueError):
+        raise _invalid_cursor()
+    if not isinstance(values, list) or len(values) != 2:
+        raise _invalid_cursor()
+    return values
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=http_status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor!"
+    )
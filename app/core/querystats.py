@@ -0,0 +1,116 @@
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from sys import modules
+from time import perf_counter
+from typing import Optional
+
+from sqlalchemy import event
+
+from app import settings
+
+access_log = logging.getLogger("app.access")
+
+
+class RepeatedQueryError(RuntimeError):
+    """The same statement ran more often than allowed within one request (likely an N+1)."""
+
+
+class QueryStats:
+    def __init__(self, repeat_limit: Optional[int] = None):
+        self.count = 0
+        self.duration = 0.0
+        self.repeat_limit = repeat_limit
+        self.shapes = Counter()
+
+    def started(self, statement: str):
+        self.count += 1
+        if self.repeat_limit is None:
+            return
+        # Parameters are bound separately, so the SQL text is the statement shape.
+        self.shapes[statement] += 1
+        if self.shapes[statement] > self.repeat_limit:
+            raise RepeatedQueryError(
+                f"Statement ran {self.shapes[statement]} times in one request "
+                f"(limit {self.repeat_limit}):\n{statement}"
+            )
+
+    def finished(self, elapsed: float):
+        self.duration += elapsed
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def repeat_limit() -> Optional[int]:
+    # N+1 detection only runs in debug and under pytest.
+    if settings.debug or "pytest" in modules:
+        return settings.query_repeat_limit
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.started(statement)
+        context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.finished(perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Attach per-request query counting and timing to an (async) engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Collects QueryStats for each request, reports them in a Server-Timing
+    header and writes one access-log line per request.
+
+    Streaming responses send their headers before the body's queries run, so
+    for those only the access log has the full numbers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.repeat_limit = repeat_limit()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats(self.repeat_limit)
+        token = current_query_stats.set(stats)
+        started = perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = stats.server_timing(perf_counter() - started).encode("latin-1")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            access_log.info(
+                "%s %s %d %.1fms queries=%d db=%.1fms",
+                scope["method"], scope["path"], status,
+                (perf_counter() - started) * 1000, stats.count, stats.duration * 1000
+            )
@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Tuple
+
+import orjson
+from fastapi.responses import Response
+
+
+def _default(value: Any):
+    # asyncpg's UUID subclass and anything else orjson doesn't know natively.
+    return str(value)
+
+
+class FastJSONResponse(Response):
+    """JSON rendered by orjson, with no pydantic validation on the way out."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+@lru_cache(maxsize=None)
+def _field_names(model) -> Tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+def to_dict(obj: Any, model) -> dict:
+    """Project an ORM object or row onto `model`'s fields, in schema order.
+
+    Only attributes named by the read model are picked, so columns such as
+    hashed_password never leak into the payload.
+    """
+    return {name: getattr(obj, name) for name in _field_names(model)}
+
+
+def to_dicts(rows: Iterable[Any], model) -> list:
+    names = _field_names(model)
+    return [{name: getattr(row, name) for name in names} for row in rows]
+
+
+def fast_response(content: Any, status_code: int = 200, response: Optional[Response] = None) -> FastJSONResponse:
+    # Carry over headers (ETag, Last-Modified, ...) set on the route's Response.
+    headers = response.headers if response is not None else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import bcrypt
+
+from app import settings
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasherStats:
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def observe_wait(self, wait_time: float):
+        self.completed += 1
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def as_dict(self) -> dict:
+        wait_time_avg = self.wait_time_total / self.completed if self.completed else 0.0
+        return {
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_avg": wait_time_avg,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism.
+    Once `workers + max_queue` jobs are outstanding new jobs are rejected
+    with `PasswordHasherBusy` instead of piling up behind the pool.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_queue: int):
+        self.rounds = rounds
+        self.max_pending = workers + max_queue
+        self.stats = PasswordHasherStats()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(self._hash, password.encode("utf-8"))
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(
+            bcrypt.checkpw, password.encode("utf-8"), hashed_password.encode("utf-8")
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _hash(self, password: bytes) -> bytes:
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds=self.rounds))
+
+    async def _submit(self, func, *args):
+        if self._pending >= self.max_pending:
+            self.stats.rejected += 1
+            raise PasswordHasherBusy("Password hashing pool is saturated")
+
+        submitted_at = perf_counter()
+
+        def run():
+            return perf_counter(), func(*args)
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, result = await loop.run_in_executor(self._executor, run)
+        finally:
+            self._pending -= 1
+
+        self.stats.observe_wait(started_at - submitted_at)
+        return result
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.password_hash_rounds,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
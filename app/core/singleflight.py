@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from app import settings
+
+
+class SingleFlightStats:
+    def __init__(self):
+        self.flights = 0
+        self.coalesced = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+        }
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The call runs in its own task and every caller awaits it through
+    `asyncio.shield`, so a cancelled caller (e.g. a disconnected client)
+    never cancels the query the other callers are waiting on.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stats = SingleFlightStats()
+        self._flights: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(func())
+        self._flights[key] = task
+        self.stats.flights += 1
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def forget(self, *keys: str):
+        # Called after a write so that later callers start a fresh call
+        # instead of joining one that may have read the old row.
+        for key in keys:
+            self._flights.pop(key, None)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller went away.
+            task.exception()
+
+
+read_flights = SingleFlight(enabled=settings.read_coalescing)
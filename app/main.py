@@ -1,26 +1,135 @@
+import logging
+from contextlib import asynccontextmanager
+from time import perf_counter
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi import status as http_status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.ext.asyncio import AsyncConnection
 
-from app import settings
+from app import import_started, settings
+from app.blog.crud import BlogCRUD, comment_batcher
+from app.blog.purge import purge_worker
+from app.core.admission import AdmissionMiddleware, read_admission, write_admission
+from app.core.compression import CompressionMiddleware, compression_stats
+from app.core.cache import NullCache, ReadThroughCache, object_cache
+from app.core.db import async_engine, async_session_factory, warm_pool
+from app.core.idempotency import IdempotencyMiddleware, idempotency_stats, idempotency_store
+from app.core.metrics import (
+    MetricsMiddleware, PoolCollector, StatsCollector, loop_lag_monitor, register_collector, registry,
+    startup_seconds
+)
 from app.core.models import HealthCheck
+from app.core.querystats import QueryStatsMiddleware
+from app.core.security import password_hasher
+from app.core.singleflight import SingleFlight, read_flights
 from app.router.api_v1.endpoints import api_router
 
-app = FastAPI(
-    title=settings.project_name,
-    version=settings.version,
-    openapi_url=f"{settings.api_v1_prefix}/openapi.json",
-    debug=settings.debug,
-)
+logger = logging.getLogger("app")
+
+# Everything above this line is the app's import cost.
+import_seconds = perf_counter() - import_started
+startup_seconds.labels("import").set(import_seconds)
+
+async def prime_connection(conn: AsyncConnection):
+    # Bypass the object cache and single-flight so every query really runs
+    # on this connection.
+    async with async_session_factory(bind=conn) as session:
+        crud = BlogCRUD(session=session, cache=ReadThroughCache(NullCache()), flights=SingleFlight(enabled=False))
+        await crud.prime_statements()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = perf_counter()
+    await warm_pool(settings.db_pool_warmup, prime=prime_connection)
+    warmup_seconds = perf_counter() - started
+    startup_seconds.labels("warmup").set(warmup_seconds)
+    logger.info(
+        "startup: import=%.0fms warmup=%.0fms (%d connections)",
+        import_seconds * 1000, warmup_seconds * 1000, async_engine.pool.checkedin()
+    )
+    if settings.metrics_enabled:
+        loop_lag_monitor.start()
+    if settings.purge_enabled:
+        purge_worker.start()
+    if settings.comment_batching:
+        comment_batcher.start()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        # Flush queued comments while the pool is still open.
+        await comment_batcher.stop()
+        await purge_worker.stop()
+        await loop_lag_monitor.stop()
+        await async_engine.dispose()
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title=settings.project_name,
+        version=settings.version,
+        openapi_url=f"{settings.api_v1_prefix}/openapi.json",
+        debug=settings.debug,
+        lifespan=lifespan,
+    )
+    app.state.ready = False
+
+    app.include_router(api_router, prefix=settings.api_v1_prefix)
+    app.add_middleware(QueryStatsMiddleware)
+    # Inside admission control, so claims and replays are shed with the rest.
+    if idempotency_store is not None:
+        app.add_middleware(IdempotencyMiddleware)
+    if settings.admission_enabled:
+        app.add_middleware(AdmissionMiddleware)
+    # Outside idempotency so stored responses stay uncompressed and replays
+    # follow each retry's own Accept-Encoding.
+    if settings.compression_enabled:
+        app.add_middleware(CompressionMiddleware)
+
+    @app.get("/", response_model=HealthCheck, tags=["status"])
+    async def health_check():
+        return {
+            "name": settings.project_name,
+            "version": settings.version,
+            "description": settings.description,
+        }
+
+    @app.get("/ready", tags=["status"])
+    async def readiness(response: Response):
+        # Only ready once the lifespan has warmed the pool.
+        if not app.state.ready:
+            response.status_code = http_status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"ready": app.state.ready}
+
+    # Metrics
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+        register_collector("db_pool", PoolCollector(async_engine))
+        register_collector("object_cache", StatsCollector("object_cache", object_cache.stats.as_dict))
+        register_collector("read_coalescing", StatsCollector("read_coalescing", read_flights.stats.as_dict))
+        register_collector("password_hasher", StatsCollector(
+            "password_hasher", password_hasher.stats.as_dict, gauges=("wait_time_avg", "wait_time_max")
+        ))
+        for admission in (read_admission, write_admission):
+            register_collector(f"admission_{admission.name}", StatsCollector(
+                f"admission_{admission.name}", admission.stats.as_dict, gauges=("in_flight", "waiting")
+            ))
+        register_collector("user_purge", StatsCollector("user_purge", purge_worker.stats.as_dict))
+        register_collector("idempotency", StatsCollector("idempotency", idempotency_stats.as_dict))
+        register_collector("compression", StatsCollector("compression", compression_stats.as_dict))
+        register_collector("comment_batching", StatsCollector(
+            "comment_batching", comment_batcher.stats.as_dict, gauges=("batch_size_max", "queued")
+        ))
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
 
-app.include_router(api_router, prefix=settings.api_v1_prefix)
+    return app
 
-@app.get("/", response_model=HealthCheck, tags=["status"])
-async def health_check():
-    return {
-        "name": settings.project_name,
-        "version": settings.version,
-        "description": settings.description,
-    }
+app = create_app()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", port=8080, host="0.0.0.0", reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", port=8080, host="0.0.0.0", reload=True)
@@ -0,0 +1,44 @@
+"""Bulk-load NDJSON into users, posts or comments.
+
+    python -m app.tools.import users users.ndjson
+    python -m app.tools.import posts - < posts.ndjson
+
+Input lines use the same fields as the /blog/export endpoints. Users may carry
+either `hashed_password` (loaded as is) or `password` (hashed with bcrypt).
+Rows without a `uuid` get one derived from their content (username and email
+for users; author, post, text and created_at otherwise), so re-importing a
+file never duplicates them; identical uuid-less rows load only once.
+"""
+import argparse
+import asyncio
+import sys
+
+import asyncpg
+
+from app.core.db import db_connection_str
+from app.tools.ndjson_import import COLUMNS, asyncpg_dsn, import_ndjson
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.import", description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(COLUMNS))
+    parser.add_argument("path", help="NDJSON file, or - for stdin")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per COPY + merge transaction")
+    parser.add_argument("--database-url", default=db_connection_str)
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace):
+    conn = await asyncpg.connect(asyncpg_dsn(args.database_url))
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        stats = await import_ndjson(conn, args.kind, source, chunk_size=args.chunk_size, progress=sys.stderr)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        await conn.close()
+    stats.report(args.kind, sys.stdout)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
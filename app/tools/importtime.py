@@ -0,0 +1,53 @@
+"""Measure how long importing the app takes, per module.
+
+    python -m app.tools.importtime --top 15
+    python -m app.tools.importtime --max-ms 1500
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter,
+prints the total and the slowest modules by cumulative time, and exits
+non-zero when the total exceeds --max-ms so startup regressions fail CI.
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+TARGET = "app.main"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.importtime", description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="slowest modules to list")
+    parser.add_argument("--max-ms", type=float, help="fail when the total import time exceeds this")
+    return parser.parse_args(argv)
+
+
+def measure(target: str = TARGET) -> List[Tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every module imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(args: argparse.Namespace) -> int:
+    rows = measure()
+    total_ms = next(cumulative for module, _, cumulative in rows if module.strip() == TARGET) / 1000
+    print(f"import {TARGET}: {total_ms:,.0f}ms")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>10,.1f}ms {self_us / 1000:>8,.1f}ms  {module.strip()}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"import time {total_ms:,.0f}ms exceeds {args.max_ms:,.0f}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,197 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import IO, Iterable, List, Optional
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+import asyncpg
+import orjson
+from sqlalchemy.engine import make_url
+
+from app import settings
+from app.core.security import PasswordHasher
+
+# Columns loaded per table, in COPY order.
+COLUMNS = {
+    "users": ("uuid", "username", "email", "hashed_password", "updated_at"),
+    "posts": ("uuid", "title", "content", "author_uuid", "created_at", "updated_at"),
+    "comments": ("uuid", "content", "post_uuid", "author_uuid", "created_at", "updated_at"),
+}
+
+# Rows without a uuid get one derived from these fields, so importing the
+# same file again maps them onto the rows the first run created.
+NATURAL_KEYS = {
+    "users": ("username", "email"),
+    "posts": ("author_uuid", "title", "content", "created_at"),
+    "comments": ("post_uuid", "author_uuid", "content", "created_at"),
+}
+IMPORT_NAMESPACE = uuid5(NAMESPACE_URL, "urn:async-app:ndjson-import")
+
+# Rows whose foreign keys don't resolve are skipped rather than failing the
+# whole chunk; ON CONFLICT makes re-running an import idempotent.
+MERGE_SQL = {
+    "users": """
+        INSERT INTO users (uuid, username, email, hashed_password, updated_at)
+        SELECT uuid, username, email, hashed_password, updated_at FROM import_users
+        ON CONFLICT (uuid) DO NOTHING
+    """,
+    "posts": """
+        INSERT INTO posts (uuid, title, content, author_uuid, created_at, updated_at)
+        SELECT s.uuid, s.title, s.content, s.author_uuid, s.created_at, s.updated_at
+        FROM import_posts s
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.uuid = s.author_uuid)
+        ON CONFLICT (uuid) DO NOTHING
+    """,
+    "comments": """
+        INSERT INTO comments (uuid, content, post_uuid, author_uuid, created_at, updated_at)
+        SELECT s.uuid, s.content, s.post_uuid, s.author_uuid, s.created_at, s.updated_at
+        FROM import_comments s
+        WHERE EXISTS (SELECT 1 FROM posts p WHERE p.uuid = s.post_uuid)
+          AND EXISTS (SELECT 1 FROM users u WHERE u.uuid = s.author_uuid)
+        ON CONFLICT (uuid) DO NOTHING
+    """,
+}
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.started_at = perf_counter()
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = perf_counter() - self.started_at
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def report(self, kind: str, out: IO = sys.stderr):
+        print(
+            f"{kind}: read={self.read} inserted={self.inserted} skipped={self.skipped} "
+            f"rows/sec={self.rows_per_second:,.0f}",
+            file=out
+        )
+
+
+def asyncpg_dsn(connection_str: str) -> str:
+    return make_url(connection_str).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def row_uuid(kind: str, row: dict) -> UUID:
+    if row.get("uuid"):
+        return UUID(row["uuid"])
+    key = orjson.dumps([kind, *(row.get(field) for field in NATURAL_KEYS[kind])])
+    return uuid5(IMPORT_NAMESPACE, key.decode())
+
+
+def parse_datetime(value: Optional[str], default: datetime) -> datetime:
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value)
+    # Columns are naive UTC timestamps.
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+async def to_records(kind: str, rows: List[dict], hasher: PasswordHasher) -> List[tuple]:
+    now = datetime.utcnow()
+    if kind == "users":
+        # Pre-hashed passwords go straight in; plain ones are hashed in the pool.
+        hashed = await asyncio.gather(*(
+            hasher.hash(row["password"]) for row in rows if not row.get("hashed_password")
+        ))
+        hashed = iter(hashed)
+        return [
+            (
+                row_uuid(kind, row),
+                row["username"],
+                row["email"],
+                row.get("hashed_password") or next(hashed),
+                parse_datetime(row.get("updated_at"), now),
+            )
+            for row in rows
+        ]
+    if kind == "posts":
+        return [
+            (
+                row_uuid(kind, row),
+                row["title"],
+                row["content"],
+                UUID(row["author_uuid"]),
+                parse_datetime(row.get("created_at"), now),
+                parse_datetime(row.get("updated_at") or row.get("created_at"), now),
+            )
+            for row in rows
+        ]
+    return [
+        (
+            row_uuid(kind, row),
+            row["content"],
+            UUID(row["post_uuid"]),
+            UUID(row["author_uuid"]),
+            parse_datetime(row.get("created_at"), now),
+            parse_datetime(row.get("updated_at") or row.get("created_at"), now),
+        )
+        for row in rows
+    ]
+
+
+def read_chunks(lines: Iterable[bytes], chunk_size: int) -> Iterable[List[dict]]:
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(orjson.loads(line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def import_ndjson(
+    conn: asyncpg.Connection,
+    kind: str,
+    lines: Iterable[bytes],
+    chunk_size: int = 50000,
+    hasher: Optional[PasswordHasher] = None,
+    progress: Optional[IO] = None
+) -> ImportStats:
+    """COPY NDJSON rows into a temp staging table, then merge them into `kind`.
+
+    Each chunk is copied and merged in its own transaction, so a failed run
+    keeps everything merged before the failing chunk.
+    """
+    columns = COLUMNS[kind]
+    staging = f"import_{kind}"
+    own_hasher = hasher is None
+    if own_hasher:
+        hasher = PasswordHasher(
+            rounds=settings.password_hash_rounds,
+            workers=settings.password_hash_workers,
+            max_queue=chunk_size
+        )
+    stats = ImportStats()
+
+    await conn.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS "
+        f"SELECT {', '.join(columns)} FROM {kind} WITH NO DATA"
+    )
+    try:
+        for rows in read_chunks(lines, chunk_size):
+            records = await to_records(kind, rows, hasher)
+            async with conn.transaction():
+                await conn.execute(f"TRUNCATE {staging}")
+                await conn.copy_records_to_table(staging, records=records, columns=columns)
+                status = await conn.execute(MERGE_SQL[kind])
+            inserted = int(status.split()[-1])
+            stats.read += len(records)
+            stats.inserted += inserted
+            stats.skipped += len(records) - inserted
+            if progress is not None:
+                stats.report(kind, progress)
+    finally:
+        if own_hasher:
+            hasher.shutdown()
+    return stats
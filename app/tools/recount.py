@@ -0,0 +1,46 @@
+"""Recompute the denormalized post and comment counters from scratch.
+
+    python -m app.tools.recount
+
+The triggers keep the counters exact, so this is only needed after
+maintenance that bypassed them (e.g. `session_replication_role = replica`
+or a restore without triggers). Only rows that drifted are rewritten.
+"""
+import argparse
+import asyncio
+import sys
+from typing import Tuple
+
+import asyncpg
+
+from app.core.counters import RECOUNT_SQL
+from app.core.db import db_connection_str
+from app.tools.ndjson_import import asyncpg_dsn
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.recount", description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=db_connection_str)
+    return parser.parse_args(argv)
+
+
+async def recount(conn: asyncpg.Connection) -> Tuple[int, int]:
+    """Repair every counter in one transaction; returns (posts, users) fixed."""
+    async with conn.transaction():
+        # Block writers so no trigger update lands between count and write.
+        await conn.execute("LOCK TABLE posts, comments IN SHARE MODE")
+        fixed = [int((await conn.execute(statement)).split()[-1]) for statement in RECOUNT_SQL]
+    return fixed[0], fixed[1]
+
+
+async def main(args: argparse.Namespace):
+    conn = await asyncpg.connect(asyncpg_dsn(args.database_url))
+    try:
+        posts, users = await recount(conn)
+    finally:
+        await conn.close()
+    print(f"recount: posts fixed={posts} users fixed={users}", file=sys.stdout)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
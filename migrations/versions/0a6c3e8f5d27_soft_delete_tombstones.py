@@ -0,0 +1,236 @@
+"""soft delete tombstones
+
+Revision ID: 0a6c3e8f5d27
+Revises: f3b7d9e2a451
+Create Date: 2026-10-18 22:40:05.731266
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c3e8f5d27'
+down_revision: Union[str, None] = 'f3b7d9e2a451'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_posts_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users u
+        SET post_count = u.post_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM new_rows
+              WHERE deleted_at IS NULL GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users u
+        SET post_count = u.post_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM old_rows
+              WHERE deleted_at IS NULL GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        -- Most updates (the comment counter included) leave the
+        -- tombstone alone.
+        IF NOT EXISTS (
+            SELECT 1 FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+            WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+        ) THEN
+            RETURN NULL;
+        END IF;
+        UPDATE users u
+        SET post_count = u.post_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT p.author_uuid, sum(CASE WHEN p.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+              FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+              WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+              GROUP BY p.author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT c.author_uuid, sum(CASE WHEN p.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+              FROM old_rows o JOIN new_rows p ON p.uuid = o.uuid
+              JOIN comments c ON c.post_uuid = p.uuid AND c.deleted_at IS NULL
+              WHERE (o.deleted_at IS NULL) <> (p.deleted_at IS NULL)
+              GROUP BY c.author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+COMMENTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_comments_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE posts p
+        SET comment_count = p.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM new_rows
+              WHERE deleted_at IS NULL GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT c.author_uuid, count(*) AS n
+              FROM new_rows c JOIN posts p ON p.uuid = c.post_uuid
+              WHERE c.deleted_at IS NULL AND p.deleted_at IS NULL
+              GROUP BY c.author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE posts p
+        SET comment_count = p.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM old_rows
+              WHERE deleted_at IS NULL GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        -- A post that is already gone was live when it was deleted (a
+        -- cascade); a tombstoned one took its comments out of the counts.
+        UPDATE users u
+        SET comment_count = u.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT c.author_uuid, count(*) AS n
+              FROM old_rows c LEFT JOIN posts p ON p.uuid = c.post_uuid
+              WHERE c.deleted_at IS NULL AND p.deleted_at IS NULL
+              GROUP BY c.author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        IF NOT EXISTS (
+            SELECT 1 FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+            WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+        ) THEN
+            RETURN NULL;
+        END IF;
+        UPDATE posts p
+        SET comment_count = p.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT c.post_uuid, sum(CASE WHEN c.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+              FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+              WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+              GROUP BY c.post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT c.author_uuid, sum(CASE WHEN c.deleted_at IS NULL THEN 1 ELSE -1 END) AS n
+              FROM old_rows o JOIN new_rows c ON c.uuid = o.uuid
+              JOIN posts p ON p.uuid = c.post_uuid AND p.deleted_at IS NULL
+              WHERE (o.deleted_at IS NULL) <> (c.deleted_at IS NULL)
+              GROUP BY c.author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+OLD_POSTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_posts_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users u
+        SET post_count = u.post_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM new_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        UPDATE users u
+        SET post_count = u.post_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM old_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+OLD_COMMENTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_comments_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE posts p
+        SET comment_count = p.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM new_rows GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM new_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        UPDATE posts p
+        SET comment_count = p.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM old_rows GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM old_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+TRIGGERS = (
+    ('posts_counters_update', 'posts', 'blog_posts_counters'),
+    ('comments_counters_update', 'comments', 'blog_comments_counters'),
+)
+
+# Indexes only used by listing, search and export become partial.
+LIVE_INDEXES = (
+    ('ix_posts_created_at_uuid', 'posts', ['created_at', 'uuid'], {}),
+    ('ix_posts_search_vector', 'posts', ['search_vector'], {'postgresql_using': 'gin'}),
+    ('ix_comments_created_at_uuid', 'comments', ['created_at', 'uuid'], {}),
+)
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.add_column('comments', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    for name, table, columns, kwargs in LIVE_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=False, postgresql_where=sa.text('deleted_at IS NULL'), **kwargs)
+    op.create_index('ix_posts_deleted_at', 'posts', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_comments_deleted_at', 'comments', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    # No tombstones exist yet, so the counters are already exact.
+    op.execute(POSTS_COUNTERS)
+    op.execute(COMMENTS_COUNTERS)
+    for name, table, function in TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+
+
+def downgrade() -> None:
+    # Tombstoned rows were already out of the counters; finish deleting them
+    # while the tombstone-aware triggers are still in place.
+    op.execute("DELETE FROM comments WHERE deleted_at IS NOT NULL")
+    op.execute("DELETE FROM comments WHERE post_uuid IN (SELECT uuid FROM posts WHERE deleted_at IS NOT NULL)")
+    op.execute("DELETE FROM posts WHERE deleted_at IS NOT NULL")
+    for name, table, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+    op.execute(OLD_POSTS_COUNTERS)
+    op.execute(OLD_COMMENTS_COUNTERS)
+    op.drop_index('ix_comments_deleted_at', table_name='comments', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.drop_index('ix_posts_deleted_at', table_name='posts', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    for name, table, columns, kwargs in LIVE_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=False, **kwargs)
+    op.drop_column('comments', 'deleted_at')
+    op.drop_column('posts', 'deleted_at')
@@ -0,0 +1,31 @@
+"""keyset pagination indexes
+
+Revision ID: 3c1f7a9d2b64
+Revises: e9ccf980b662
+Create Date: 2026-10-18 15:02:11.412807
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9d2b64'
+down_revision: Union[str, None] = 'e9ccf980b662'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_created_at_uuid', 'posts', ['created_at', 'uuid'], unique=False)
+    op.create_index('ix_posts_author_uuid_created_at_uuid', 'posts', ['author_uuid', 'created_at', 'uuid'], unique=False)
+    op.create_index('ix_comments_post_uuid_created_at_uuid', 'comments', ['post_uuid', 'created_at', 'uuid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_post_uuid_created_at_uuid', table_name='comments')
+    op.drop_index('ix_posts_author_uuid_created_at_uuid', table_name='posts')
+    op.drop_index('ix_posts_created_at_uuid', table_name='posts')
@@ -0,0 +1,29 @@
+"""updated_at columns
+
+Revision ID: 8d2e4b6f1a39
+Revises: 3c1f7a9d2b64
+Create Date: 2026-10-18 15:24:40.193552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6f1a39'
+down_revision: Union[str, None] = '3c1f7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('users', 'posts', 'comments'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False))
+
+
+def downgrade() -> None:
+    for table in ('comments', 'posts', 'users'):
+        op.drop_column(table, 'updated_at')
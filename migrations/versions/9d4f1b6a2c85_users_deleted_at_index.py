@@ -0,0 +1,27 @@
+"""users deleted_at index
+
+Revision ID: 9d4f1b6a2c85
+Revises: 7c2e4a9d1b63
+Create Date: 2026-10-19 10:41:12.380517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f1b6a2c85'
+down_revision: Union[str, None] = '7c2e4a9d1b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_deleted_at', 'users', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_deleted_at', table_name='users', postgresql_where=sa.text('deleted_at IS NOT NULL'))
@@ -0,0 +1,27 @@
+"""comments export index
+
+Revision ID: b7a5e1c9d042
+Revises: 8d2e4b6f1a39
+Create Date: 2026-10-18 15:41:07.655120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7a5e1c9d042'
+down_revision: Union[str, None] = '8d2e4b6f1a39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_comments_created_at_uuid', 'comments', ['created_at', 'uuid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_created_at_uuid', table_name='comments')
@@ -0,0 +1,117 @@
+"""denormalized counters
+
+Revision ID: d2f6a8c1e540
+Revises: c4d8f2a6e317
+Create Date: 2026-10-18 17:21:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6a8c1e540'
+down_revision: Union[str, None] = 'c4d8f2a6e317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_posts_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users u
+        SET post_count = u.post_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM new_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        UPDATE users u
+        SET post_count = u.post_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM old_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+COMMENTS_COUNTERS = """
+CREATE OR REPLACE FUNCTION blog_comments_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE posts p
+        SET comment_count = p.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM new_rows GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count + d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM new_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    ELSE
+        UPDATE posts p
+        SET comment_count = p.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT post_uuid, count(*) AS n FROM old_rows GROUP BY post_uuid) d
+        WHERE p.uuid = d.post_uuid;
+        UPDATE users u
+        SET comment_count = u.comment_count - d.n,
+            updated_at = timezone('utc', clock_timestamp())
+        FROM (SELECT author_uuid, count(*) AS n FROM old_rows GROUP BY author_uuid) d
+        WHERE u.uuid = d.author_uuid;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+TRIGGERS = (
+    ('posts_counters_insert', 'posts', 'INSERT', 'NEW TABLE AS new_rows', 'blog_posts_counters'),
+    ('posts_counters_delete', 'posts', 'DELETE', 'OLD TABLE AS old_rows', 'blog_posts_counters'),
+    ('comments_counters_insert', 'comments', 'INSERT', 'NEW TABLE AS new_rows', 'blog_comments_counters'),
+    ('comments_counters_delete', 'comments', 'DELETE', 'OLD TABLE AS old_rows', 'blog_comments_counters'),
+)
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('post_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('users', sa.Column('comment_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute(POSTS_COUNTERS)
+    op.execute(COMMENTS_COUNTERS)
+    for name, table, event, transition, function in TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} REFERENCING {transition} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    # Backfill existing rows; the triggers keep them exact from here on.
+    op.execute(
+        "UPDATE posts p SET comment_count = c.n "
+        "FROM (SELECT post_uuid, count(*) AS n FROM comments GROUP BY post_uuid) c "
+        "WHERE p.uuid = c.post_uuid"
+    )
+    op.execute(
+        "UPDATE users u SET post_count = p.n "
+        "FROM (SELECT author_uuid, count(*) AS n FROM posts GROUP BY author_uuid) p "
+        "WHERE u.uuid = p.author_uuid"
+    )
+    op.execute(
+        "UPDATE users u SET comment_count = c.n "
+        "FROM (SELECT author_uuid, count(*) AS n FROM comments GROUP BY author_uuid) c "
+        "WHERE u.uuid = c.author_uuid"
+    )
+
+
+def downgrade() -> None:
+    for name, table, _, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS blog_comments_counters()")
+    op.execute("DROP FUNCTION IF EXISTS blog_posts_counters()")
+    op.drop_column('posts', 'comment_count')
+    op.drop_column('users', 'comment_count')
+    op.drop_column('users', 'post_count')
@@ -0,0 +1,60 @@
+"""uuid primary keys v7
+
+Revision ID: e5a1c7f3b918
+Revises: d2f6a8c1e540
+Create Date: 2026-10-18 19:02:11.604377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c7f3b918'
+down_revision: Union[str, None] = 'd2f6a8c1e540'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID7_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE
+"""
+
+TABLES = ('users', 'posts', 'comments')
+
+FOREIGN_KEYS = (
+    ('fk_posts_author_uuid_users', 'posts', 'users', 'author_uuid'),
+    ('fk_comments_author_uuid_users', 'comments', 'users', 'author_uuid'),
+    ('fk_comments_post_uuid_posts', 'comments', 'posts', 'post_uuid'),
+)
+
+
+def upgrade() -> None:
+    op.execute(UUID7_FUNCTION)
+    for table in TABLES:
+        # The unique index becomes the primary key as is: no rebuild, and the
+        # foreign keys that depend on it stay valid.
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT pk_{table} PRIMARY KEY USING INDEX ix_{table}_uuid')
+        op.alter_column(table, 'uuid', server_default=sa.text('uuid_generate_v7()'))
+
+
+def downgrade() -> None:
+    for name, table, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+    for table in TABLES:
+        op.alter_column(table, 'uuid', server_default=sa.text('gen_random_uuid()'))
+        op.drop_constraint(f'pk_{table}', table, type_='primary')
+        op.create_index(f'ix_{table}_uuid', table, ['uuid'], unique=True)
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, referred, [column], ['uuid'])
+    op.execute('DROP FUNCTION IF EXISTS uuid_generate_v7()')
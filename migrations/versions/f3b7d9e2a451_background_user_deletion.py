@@ -0,0 +1,55 @@
+"""background user deletion
+
+Revision ID: f3b7d9e2a451
+Revises: e5a1c7f3b918
+Create Date: 2026-10-18 21:14:37.218904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d9e2a451'
+down_revision: Union[str, None] = 'e5a1c7f3b918'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEYS = (
+    ('fk_posts_author_uuid_users', 'posts', 'users', 'author_uuid'),
+    ('fk_comments_author_uuid_users', 'comments', 'users', 'author_uuid'),
+    ('fk_comments_post_uuid_posts', 'comments', 'posts', 'post_uuid'),
+)
+
+
+def _replace_foreign_keys(ondelete):
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['uuid'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _replace_foreign_keys('CASCADE')
+    op.create_index('ix_comments_author_uuid', 'comments', ['author_uuid'], unique=False)
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_table('user_deletions',
+    sa.Column('user_uuid', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('requested_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.Column('comments_deleted', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('posts_deleted', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_uuid', name=op.f('pk_user_deletions'))
+    )
+    op.create_index('ix_user_deletions_pending', 'user_deletions', ['requested_at'], unique=False,
+                    postgresql_where=sa.text('finished_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_deletions_pending', table_name='user_deletions', postgresql_where=sa.text('finished_at IS NULL'))
+    op.drop_table('user_deletions')
+    op.drop_column('users', 'deleted_at')
+    op.drop_index('ix_comments_author_uuid', table_name='comments')
+    _replace_foreign_keys(None)